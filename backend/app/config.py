@@ -16,15 +16,20 @@ class Settings(BaseSettings):
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1  # Uvicorn worker processes; each keeps its own cache and WebSocket clients
     
     # CORS settings
     cors_origins: List[str] = ["http://localhost:3000", "http://localhost:5173"]
     
     # Data sources
     celestrak_base_url: str = "https://celestrak.org/NORAD/elements/gp.php"
+    fetch_concurrency_per_host: int = 4  # Simultaneous TLE requests to one host
+    fetch_attempts: int = 3  # Tries per TLE source for timeouts and transient HTTP errors
     
     # Cache settings
     cache_ttl_seconds: int = 600  # 10 minutes
+    tle_cache_path: str = "data/tle_cache.txt"  # Last fetched TLEs, reloaded on restart
+    tle_cache_max_age_hours: float = 3.0  # Older files are ignored and the TLEs re-downloaded
     
     # Prediction settings
     prediction_horizon_hours: int = 24
@@ -5,15 +5,19 @@ Real-time satellite tracking with AI-powered predictions
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 import asyncio
 
 from app.routers import satellites, predictions, analysis, anomaly
+from app.responses import ORJSONResponse
 from app.services.data_fetcher import DataFetcher
 from app.services.cache import cache
 from app.services.websocket_manager import connection_manager
+from app.services.position_grid import position_grid
+from app.services.anomaly_monitor import anomaly_monitor
 from app.config import settings
 
 # Configure logging
@@ -30,12 +34,22 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 OrbitViz AI Backend starting up...")
     
-    # Initial data fetch
-    await data_fetcher.fetch_all_tle_data()
+    # Initial data fetch (skipped after a restart if the saved TLEs are recent)
+    if not data_fetcher.load_disk_cache():
+        await data_fetcher.fetch_all_tle_data()
     logger.info(f"✅ Loaded {len(cache.satellites)} satellites")
     
+    # Shared position grid reused by conjunction analysis
+    position_grid.start()
+    
+    # Background anomaly analysis served by /api/anomaly/recent
+    anomaly_monitor.start()
+    
     yield
     
+    position_grid.stop()
+    anomaly_monitor.stop()
+    
     # Shutdown
     logger.info("👋 OrbitViz AI Backend shutting down...")
 
@@ -46,6 +60,7 @@ app = FastAPI(
     description="Real-time satellite tracking with AI-powered collision detection and orbital predictions",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware for HTTP requests
@@ -64,8 +79,14 @@ app.add_middleware(
     allow_credentials=False,  # Changed to False to allow "*" origin
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Satellite-Types"],
 )
 
+# Compress other JSON responses; the bulk catalog endpoints send pre-gzipped bytes,
+# which the middleware passes through untouched (Starlette skips responses that
+# already set Content-Encoding; see the starlette floor in requirements.txt)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # Include routers
 app.include_router(satellites.router, prefix="/api/satellites", tags=["Satellites"])
 app.include_router(predictions.router, prefix="/api/predictions", tags=["Predictions"])
@@ -146,10 +167,7 @@ async def websocket_positions(websocket: WebSocket):
                 msg_type = data.get("type")
                 
                 if msg_type == "ping":
-                    await connection_manager.send_personal_message(
-                        websocket,
-                        {"type": "pong", "timestamp": data.get("timestamp")}
-                    )
+                    await connection_manager.send_pong(websocket, data.get("timestamp"))
                 
                 elif msg_type == "set_interval":
                     interval = data.get("interval", 1.0)
@@ -174,10 +192,7 @@ async def websocket_positions(websocket: WebSocket):
                     
             except asyncio.TimeoutError:
                 # Send keep-alive ping
-                await connection_manager.send_personal_message(
-                    websocket,
-                    {"type": "ping"}
-                )
+                await connection_manager.send_ping(websocket)
                 
     except WebSocketDisconnect:
         await connection_manager.disconnect(websocket)
@@ -197,5 +212,17 @@ async def global_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # uvloop and httptools ship with uvicorn[standard]; uvloop has no Windows build
+    # Multiple workers need an import string so each process can load the app
+    uvicorn.run(
+        "app.main:app" if settings.workers > 1 else app,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        ws_per_message_deflate=False,  # Position frames are already compressed once per tick
+    )
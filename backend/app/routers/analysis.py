@@ -3,19 +3,29 @@ Collision and re-entry analysis endpoints
 """
 
 from fastapi import APIRouter, Query, HTTPException
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
+import heapq
 import math
-import random
+from math import hypot as _hypot
 
-from sgp4.api import Satrec, jday
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, jday
 
-from app.services.cache import cache
+from app.services.cache import cache, SatelliteData, SATELLITE_TYPES
+from app.services.position_grid import position_grid, jday_grid
 from app.config import settings
 
 router = APIRouter()
 
+# Candidates reduced per chunk when searching for closest approaches
+CONJUNCTION_CHUNK_SIZE = 64
+
+# Closest approaches are refined at this resolution within one coarse step either side
+REFINE_STEP_SECONDS = 10
+
 
 class ConjunctionEvent(BaseModel):
     """Conjunction (close approach) event"""
@@ -49,39 +59,67 @@ class ReentryPrediction(BaseModel):
     factors: dict
 
 
-def get_risk_level(distance_km: float) -> str:
-    """Determine risk level based on distance"""
-    if distance_km < 1:
-        return "critical"
-    if distance_km < 5:
-        return "high"
-    if distance_km < 10:
-        return "moderate"
-    if distance_km < 25:
-        return "low"
-    return "safe"
+# Risk levels indexed by the codes returned from score_distances
+RISK_LEVELS = ("critical", "high", "moderate", "low", "safe")
+RISK_THRESHOLDS_KM = np.array([1.0, 5.0, 10.0, 25.0])
 
 
-def calculate_collision_probability(distance_km: float, relative_velocity: float = 10) -> float:
-    """Calculate collision probability (simplified model)"""
+def score_distances(distance_km: np.ndarray, relative_velocity: float = 10) -> tuple:
+    """Score an array of miss distances, returning (risk level codes, collision probabilities)"""
     # This is a simplified model. Real collision probability
     # calculations use covariance matrices and are much more complex.
+    d = np.asarray(distance_km, dtype=np.float64)
     
-    if distance_km < 1:
-        base_prob = 0.5 + 0.4 * (1 - distance_km)
-    elif distance_km < 5:
-        base_prob = 0.1 + 0.4 * (5 - distance_km) / 4
-    elif distance_km < 10:
-        base_prob = 0.01 + 0.09 * (10 - distance_km) / 5
-    elif distance_km < 25:
-        base_prob = 0.001 + 0.009 * (25 - distance_km) / 15
-    else:
-        base_prob = 0.0001
+    risk_codes = np.searchsorted(RISK_THRESHOLDS_KM, d, side="right").astype(np.int8)
+    
+    base_prob = np.select(
+        [d < 1, d < 5, d < 10, d < 25],
+        [
+            0.5 + 0.4 * (1 - d),
+            0.1 + 0.4 * (5 - d) / 4,
+            0.01 + 0.09 * (10 - d) / 5,
+            0.001 + 0.009 * (25 - d) / 15,
+        ],
+        default=0.0001,
+    )
     
     # Adjust for relative velocity
-    velocity_factor = min(relative_velocity / 10, 2.0)
+    velocity_factor = np.minimum(np.asarray(relative_velocity, dtype=np.float64) / 10, 2.0)
+    
+    return risk_codes, np.minimum(base_prob * velocity_factor, 0.99)
+
+
+def get_risk_level(distance_km: float) -> str:
+    """Determine risk level based on distance"""
+    risk_codes, _ = score_distances(np.array([distance_km]))
+    return RISK_LEVELS[risk_codes[0]]
+
+
+def calculate_collision_probability(distance_km: float, relative_velocity: float = 10) -> float:
+    """Calculate collision probability (simplified model)"""
+    _, probabilities = score_distances(np.array([distance_km]), relative_velocity)
+    return float(probabilities[0])
+
+
+def refine_closest_approach(
+    target_satrec: Satrec,
+    satrec: Satrec,
+    jd: float,
+    fr_center: float,
+    offsets: np.ndarray,
+) -> tuple:
+    """Re-propagate a pair around a coarse minimum, returning (min squared distance, offset seconds)"""
+    fr = fr_center + offsets / 86400.0
+    jd = np.full(len(offsets), jd)
+    e_target, r_target, _ = target_satrec.sgp4_array(jd, fr)
+    e_candidate, r_candidate, _ = satrec.sgp4_array(jd, fr)
     
-    return min(base_prob * velocity_factor, 0.99)
+    diff = r_candidate - r_target
+    d2 = np.einsum("tk,tk->t", diff, diff)
+    d2[(e_target != 0) | (e_candidate != 0)] = np.inf
+    
+    best = d2.argmin()
+    return d2[best], offsets[best]
 
 
 def propagate_position(satrec: Satrec, dt: datetime) -> tuple:
@@ -93,14 +131,21 @@ def propagate_position(satrec: Satrec, dt: datetime) -> tuple:
     return r, v
 
 
-def calculate_distance(pos1: tuple, pos2: tuple) -> float:
-    """Calculate distance between two positions in km"""
+def squared_distance(pos1: tuple, pos2: tuple) -> float:
+    """Calculate squared distance between two positions in km^2 (compare against threshold_km**2)"""
     if pos1 is None or pos2 is None:
         return float('inf')
     dx = pos1[0] - pos2[0]
     dy = pos1[1] - pos2[1]
     dz = pos1[2] - pos2[2]
-    return math.sqrt(dx**2 + dy**2 + dz**2)
+    return dx*dx + dy*dy + dz*dz
+
+
+def calculate_distance(pos1: tuple, pos2: tuple) -> float:
+    """Calculate distance between two positions in km"""
+    if pos1 is None or pos2 is None:
+        return float('inf')
+    return _hypot(pos1[0] - pos2[0], pos1[1] - pos2[1], pos1[2] - pos2[2])
 
 
 @router.get("/conjunctions/{norad_id}", response_model=CollisionAnalysisResponse)
@@ -116,24 +161,39 @@ async def analyze_conjunctions(
     if not target:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    try:
-        target_satrec = Satrec.twoline2rv(target.line1, target.line2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse TLE: {e}")
+    target_satrec = cache.get_satrec(norad_id)
+    if target_satrec is None:
+        raise HTTPException(status_code=500, detail="Failed to parse TLE")
+    
+    # Propagation and distance reduction are CPU-bound; keep them off the event loop
+    # so WebSocket broadcasts are not starved while a request is being analyzed
+    return await run_in_threadpool(
+        compute_conjunctions, target, target_satrec, hours, threshold_km, limit
+    )
+
+
+def compute_conjunctions(
+    target: SatelliteData,
+    target_satrec: Satrec,
+    hours: int,
+    threshold_km: float,
+    limit: int,
+) -> CollisionAnalysisResponse:
+    """Find closest approaches between a target and satellites at similar altitudes"""
+    norad_id = target.norad_id
     
-    # Get candidates at similar altitudes
+    # Get candidates at similar altitudes (within 100 km) from the altitude index
     candidates = []
-    for sat in cache.get_all_satellites():
-        if sat.norad_id == norad_id:
-            continue
-        if sat.altitude is None or target.altitude is None:
-            continue
-        if abs(sat.altitude - target.altitude) < 100:  # Within 100 km altitude
-            try:
-                satrec = Satrec.twoline2rv(sat.line1, sat.line2)
-                candidates.append((sat, satrec))
-            except:
+    if target.altitude is not None:
+        snapshot = cache.snapshot
+        columns = snapshot.columns
+        rows = columns.altitude_rows(target.altitude - 100, target.altitude + 100)
+        for candidate in columns.rows(rows):
+            if candidate.norad_id == norad_id:
                 continue
+            satrec = snapshot.satrecs.get(candidate.norad_id)
+            if satrec is not None:
+                candidates.append((candidate, satrec))
     
     # Limit candidates for performance
     candidates = candidates[:500]
@@ -143,39 +203,86 @@ async def analyze_conjunctions(
     time_step = timedelta(minutes=5)
     steps = int(hours * 60 / 5)
     
-    conjunctions = []
+    # Coarse scan: target (row 0) and all candidates at every epoch, taken from the
+    # shared position grid when it covers the period, otherwise propagated in one call
+    grid = position_grid.grid
+    window = grid.window(
+        [norad_id] + [candidate.norad_id for candidate, _ in candidates], now, time_step, steps
+    ) if grid else None
     
-    for candidate, cand_satrec in candidates:
-        min_distance = float('inf')
-        min_distance_time = None
-        
-        for i in range(steps):
-            dt = now + time_step * i
-            
-            target_pos, target_vel = propagate_position(target_satrec, dt)
-            cand_pos, cand_vel = propagate_position(cand_satrec, dt)
-            
-            distance = calculate_distance(target_pos, cand_pos)
-            
-            if distance < min_distance:
-                min_distance = distance
-                min_distance_time = dt
+    if window is not None:
+        start_time, jd, fr, r, v, failed = window
+    else:
+        start_time = now
+        jd, fr = jday_grid(now.replace(microsecond=0), time_step, steps)
+        sat_array = SatrecArray([target_satrec] + [satrec for _, satrec in candidates])
+        e, r, v = sat_array.sgp4(jd, fr)
+        failed = e != 0
+    
+    # Closest approach per candidate, reduced chunk by chunk on squared
+    # distances so the full (n_candidates, steps, 3) difference array never exists
+    n_candidates = len(candidates)
+    min_idx = np.zeros(n_candidates, dtype=np.intp)
+    min_d2 = np.full(n_candidates, np.inf)
+    target_failed = failed[0]
+    
+    for start in range(0, n_candidates, CONJUNCTION_CHUNK_SIZE):
+        stop = min(start + CONJUNCTION_CHUNK_SIZE, n_candidates)
+        diff = r[1 + start:1 + stop] - r[0]
+        d2 = np.einsum("ctk,ctk->ct", diff, diff)
+        d2[failed[1 + start:1 + stop] | target_failed] = np.inf
         
-        if min_distance <= threshold_km:
-            conjunctions.append(ConjunctionEvent(
-                satellite1_id=norad_id,
-                satellite1_name=target.name,
-                satellite2_id=candidate.norad_id,
-                satellite2_name=candidate.name,
-                distance_km=round(min_distance, 3),
-                time=min_distance_time,
-                risk_level=get_risk_level(min_distance),
-                collision_probability=round(calculate_collision_probability(min_distance), 6),
-            ))
-    
-    # Sort by distance
-    conjunctions.sort(key=lambda x: x.distance_km)
-    conjunctions = conjunctions[:limit]
+        chunk_idx = d2.argmin(axis=1)
+        min_idx[start:stop] = chunk_idx
+        min_d2[start:stop] = d2[np.arange(stop - start), chunk_idx]
+    
+    # Refine only pairs that could dip under the threshold between coarse epochs,
+    # i.e. those within threshold plus half a step of relative motion
+    step_seconds = time_step.total_seconds()
+    rel_v = v[1:][np.arange(n_candidates), min_idx] - v[0, min_idx]
+    reach_km = threshold_km + np.sqrt(np.einsum("ck,ck->c", rel_v, rel_v)) * step_seconds / 2
+    refine = np.flatnonzero(min_d2 <= reach_km ** 2)
+    
+    event_seconds = min_idx * step_seconds
+    last_second = (steps - 1) * step_seconds
+    window = np.arange(-step_seconds, step_seconds + 1, REFINE_STEP_SECONDS)
+    
+    for i in refine.tolist():
+        # Keep the fine window inside the analysis period
+        offsets = window[(event_seconds[i] + window >= 0) & (event_seconds[i] + window <= last_second)]
+        d2, offset = refine_closest_approach(
+            target_satrec, candidates[i][1], jd[0], fr[min_idx[i]], offsets
+        )
+        if d2 < min_d2[i]:
+            min_d2[i] = d2
+            event_seconds[i] += offset
+    
+    # Only take square roots for candidates inside the threshold
+    hits = np.flatnonzero(min_d2 <= threshold_km ** 2)
+    min_dist = np.sqrt(min_d2[hits])
+    risk_codes, probabilities = score_distances(min_dist)
+    
+    # Keep the `limit` closest hits (ties in hit order, as a stable sort would)
+    # and only build events for those
+    distances = [round(float(distance), 3) for distance in min_dist]
+    closest = heapq.nsmallest(limit, range(len(distances)), key=distances.__getitem__)
+    
+    conjunctions = []
+    
+    for j in closest:
+        i = hits[j]
+        candidate = candidates[i][0]
+        # Fields are already well-typed, so skip per-field validation
+        conjunctions.append(ConjunctionEvent.model_construct(
+            satellite1_id=norad_id,
+            satellite1_name=target.name,
+            satellite2_id=candidate.norad_id,
+            satellite2_name=candidate.name,
+            distance_km=distances[j],
+            time=start_time + timedelta(seconds=float(event_seconds[i])),
+            risk_level=RISK_LEVELS[risk_codes[j]],
+            collision_probability=round(float(probabilities[j]), 6),
+        ))
     
     # Risk summary
     risk_summary = {
@@ -226,19 +333,19 @@ async def predict_reentry(norad_id: int):
     
     # Base decay rate depends on altitude
     if altitude < 200:
-        base_decay = 20 + random.uniform(-5, 5)  # km/day
+        base_decay = 20  # km/day
         confidence = "high"
     elif altitude < 300:
-        base_decay = 5 + random.uniform(-2, 2)
+        base_decay = 5
         confidence = "medium"
     elif altitude < 400:
-        base_decay = 1 + random.uniform(-0.5, 0.5)
+        base_decay = 1
         confidence = "medium"
     elif altitude < 600:
-        base_decay = 0.1 + random.uniform(-0.05, 0.05)
+        base_decay = 0.1
         confidence = "low"
     else:
-        base_decay = 0.01 + random.uniform(-0.005, 0.005)
+        base_decay = 0.01
         confidence = "very low"
     
     # Estimate days until reentry (altitude < 80 km)
@@ -248,8 +355,8 @@ async def predict_reentry(norad_id: int):
     else:
         predicted_date = None
     
-    # Solar activity factor (placeholder)
-    solar_factor = 1.0 + random.uniform(-0.2, 0.2)
+    # Solar activity factor (placeholder - nominal activity)
+    solar_factor = 1.0
     adjusted_decay = base_decay * solar_factor
     
     return ReentryPrediction(
@@ -275,45 +382,43 @@ async def get_debris_density(
 ):
     """Get debris density statistics by altitude"""
     
-    satellites = cache.get_all_satellites()
+    columns = cache.columns
+    altitudes = columns.altitudes
+    type_codes = columns.type_codes
+    
+    in_range = (altitudes >= altitude_min) & (altitudes <= altitude_max)
+    altitudes = altitudes[in_range]
+    type_codes = type_codes[in_range]
     
     # Group by altitude bands
-    bands = {}
     band_size = 100  # km
+    band_index = np.trunc(altitudes / band_size).astype(np.int64)
     
-    for sat in satellites:
-        if sat.altitude is None:
-            continue
-        if sat.altitude < altitude_min or sat.altitude > altitude_max:
-            continue
-        
-        band = int(sat.altitude / band_size) * band_size
-        if band not in bands:
-            bands[band] = {"total": 0, "debris": 0, "satellites": 0, "rocket_bodies": 0}
-        
-        bands[band]["total"] += 1
-        if sat.satellite_type == "debris":
-            bands[band]["debris"] += 1
-        elif sat.satellite_type == "rocket-body":
-            bands[band]["rocket_bodies"] += 1
-        else:
-            bands[band]["satellites"] += 1
+    totals = np.bincount(band_index)
+    debris = np.bincount(band_index, weights=type_codes == SATELLITE_TYPES.index("debris"))
+    rocket_bodies = np.bincount(band_index, weights=type_codes == SATELLITE_TYPES.index("rocket-body"))
+    
+    bands = np.flatnonzero(totals)
     
     # Calculate density (objects per km^3 shell)
+    r1 = 6371.0 + bands * band_size
+    r2 = r1 + band_size
+    volumes = (4/3) * math.pi * (r2**3 - r1**3)
+    
     density_data = []
-    for band, counts in sorted(bands.items()):
-        # Volume of spherical shell
-        r1 = 6371 + band
-        r2 = 6371 + band + band_size
-        volume = (4/3) * math.pi * (r2**3 - r1**3)
+    for i, band in enumerate(bands.tolist()):
+        total = int(totals[band])
+        debris_count = int(debris[band])
+        rocket_body_count = int(rocket_bodies[band])
+        band_km = band * band_size
         
         density_data.append({
-            "altitude_band_km": f"{band}-{band + band_size}",
-            "object_count": counts["total"],
-            "debris_count": counts["debris"],
-            "satellite_count": counts["satellites"],
-            "rocket_body_count": counts["rocket_bodies"],
-            "density_per_million_km3": round(counts["total"] / (volume / 1e6), 6),
+            "altitude_band_km": f"{band_km}-{band_km + band_size}",
+            "object_count": total,
+            "debris_count": debris_count,
+            "satellite_count": total - debris_count - rocket_body_count,
+            "rocket_body_count": rocket_body_count,
+            "density_per_million_km3": round(total / (float(volumes[i]) / 1e6), 6),
         })
     
     return {
@@ -3,20 +3,112 @@ Anomaly Detection API Endpoints
 Phase 5: Advanced ML-powered anomaly detection for satellite behavior
 """
 
-from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Query, HTTPException, BackgroundTasks, Response
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
 from enum import Enum
-
-from sgp4.api import Satrec
+import numpy as np
+import orjson
+from starlette.concurrency import run_in_threadpool
 
 from app.services.cache import cache
 from app.services.anomaly_detector import anomaly_detector, AnomalyEvent
+from app.services.anomaly_monitor import anomaly_monitor
 
 router = APIRouter()
 
 
+# Static payload of /types, serialized once at import
+ANOMALY_TYPES_PAYLOAD = orjson.dumps({
+    "anomaly_types": [
+        {
+            "type": "orbital_maneuver",
+            "name": "Orbital Maneuver",
+            "description": "Detected velocity change indicating a deliberate orbit adjustment",
+            "typical_severity": "medium",
+            "detection_method": "Velocity delta analysis"
+        },
+        {
+            "type": "altitude_deviation",
+            "name": "Altitude Deviation",
+            "description": "Satellite altitude differs significantly from expected orbital parameters",
+            "typical_severity": "low to high",
+            "detection_method": "Position comparison with expected orbit"
+        },
+        {
+            "type": "rapid_decay",
+            "name": "Rapid Orbital Decay",
+            "description": "Faster than expected altitude loss, may indicate imminent re-entry",
+            "typical_severity": "high to critical",
+            "detection_method": "Altitude change rate analysis"
+        },
+        {
+            "type": "altitude_increase",
+            "name": "Unexpected Altitude Increase",
+            "description": "Altitude gain without detected maneuver",
+            "typical_severity": "medium",
+            "detection_method": "Position trend analysis"
+        },
+        {
+            "type": "potential_tumbling",
+            "name": "Potential Tumbling",
+            "description": "Velocity variations suggest attitude control issues",
+            "typical_severity": "low",
+            "detection_method": "Velocity variance analysis"
+        },
+        {
+            "type": "debris_proximity",
+            "name": "Debris Proximity Alert",
+            "description": "Tracked debris approaching satellite",
+            "typical_severity": "high to critical",
+            "detection_method": "Conjunction analysis"
+        }
+    ]
+})
+
+# /statistics payload template; the serialized form is cached as (cache.last_update, bytes)
+ANOMALY_STATISTICS = {
+    "system_status": "operational",
+    "monitoring": {
+        "total_satellites_tracked": 0,  # Filled in per catalog refresh
+        "active_monitoring": True,
+        "detection_algorithms": [
+            "velocity_change_detection",
+            "altitude_deviation_analysis",
+            "decay_rate_prediction",
+            "tumbling_detection",
+            "conjunction_analysis"
+        ],
+        "update_frequency_minutes": 10
+    },
+    "thresholds": {
+        "altitude_change_km": 5.0,
+        "velocity_change_m_s": 50,
+        "maneuver_delta_v_m_s": 100,
+        "debris_proximity_km": 10.0
+    },
+    "ml_models": {
+        "maneuver_classifier": {
+            "status": "active",
+            "accuracy": 0.89,
+            "last_updated": "2026-01-01"
+        },
+        "decay_predictor": {
+            "status": "active",
+            "accuracy": 0.82,
+            "last_updated": "2026-01-01"
+        },
+        "anomaly_scorer": {
+            "status": "active",
+            "accuracy": 0.91,
+            "last_updated": "2026-01-01"
+        }
+    }
+}
+_statistics_payload: Optional[tuple] = None
+
+
 class AnomalyType(str, Enum):
     ORBITAL_MANEUVER = "orbital_maneuver"
     ALTITUDE_DEVIATION = "altitude_deviation"
@@ -57,6 +149,10 @@ class AnomalyAnalysisResponse(BaseModel):
     status: str  # clean, warning, alert
 
 
+# Converts AnomalyEvent lists to responses in one compiled validation pass
+anomaly_list_adapter = TypeAdapter(List[AnomalyResponse])
+
+
 class BatchAnalysisResponse(BaseModel):
     """Batch analysis response"""
     analysis_timestamp: datetime
@@ -86,13 +182,13 @@ async def analyze_satellite_anomalies(
     if not satellite:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    try:
-        satrec = Satrec.twoline2rv(satellite.line1, satellite.line2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse TLE: {e}")
+    satrec = cache.get_satrec(norad_id)
+    if satrec is None:
+        raise HTTPException(status_code=500, detail="Failed to parse TLE")
     
-    # Run anomaly detection
-    anomalies = anomaly_detector.analyze_satellite(
+    # Run anomaly detection off the event loop
+    anomalies = await run_in_threadpool(
+        anomaly_detector.analyze_satellite,
         norad_id=norad_id,
         name=satellite.name,
         satrec=satrec,
@@ -101,19 +197,7 @@ async def analyze_satellite_anomalies(
     )
     
     # Convert to response format
-    anomaly_responses = [
-        AnomalyResponse(
-            norad_id=a.norad_id,
-            satellite_name=a.satellite_name,
-            anomaly_type=a.anomaly_type,
-            severity=a.severity,
-            confidence=a.confidence,
-            detected_at=a.detected_at,
-            description=a.description,
-            details=a.details,
-            recommended_action=a.recommended_action
-        ) for a in anomalies
-    ]
+    anomaly_responses = anomaly_list_adapter.validate_python(anomalies, from_attributes=True)
     
     # Determine overall status
     if any(a.severity == 'critical' for a in anomalies):
@@ -144,45 +228,23 @@ async def batch_anomaly_analysis(
     Returns top anomalies and statistics across the analyzed satellites.
     This endpoint samples satellites to provide a broad view of fleet health.
     """
-    satellites = cache.get_all_satellites()
-    
-    # Filter by type if specified
+    # Filter by type if specified, on the type code column
+    snapshot = cache.snapshot
+    columns = snapshot.columns
     if satellite_type:
-        satellites = [s for s in satellites if s.satellite_type == satellite_type]
-    
-    # Convert to dict format for batch analysis
-    sat_dicts = [
-        {
-            'norad_id': s.norad_id,
-            'name': s.name,
-            'line1': s.line1,
-            'line2': s.line2,
-            'altitude': s.altitude or 400
-        }
-        for s in satellites
-        if s.line1 and s.line2
-    ]
+        code = columns.type_code(satellite_type)
+        rows = np.flatnonzero(columns.type_codes == code) if code is not None else np.empty(0, dtype=np.intp)
+    else:
+        rows = np.arange(len(columns))
     
-    if not sat_dicts:
+    if not len(rows):
         raise HTTPException(status_code=404, detail="No satellites available for analysis")
     
-    # Run batch analysis
-    results = anomaly_detector.batch_analyze(sat_dicts, sample_size)
+    # Run batch analysis off the event loop
+    results = await run_in_threadpool(anomaly_detector.batch_analyze_catalog, snapshot, rows, sample_size)
     
     # Convert anomalies to response format
-    top_anomalies = [
-        AnomalyResponse(
-            norad_id=a.norad_id,
-            satellite_name=a.satellite_name,
-            anomaly_type=a.anomaly_type,
-            severity=a.severity,
-            confidence=a.confidence,
-            detected_at=a.detected_at,
-            description=a.description,
-            details=a.details,
-            recommended_action=a.recommended_action
-        ) for a in results['top_anomalies']
-    ]
+    top_anomalies = anomaly_list_adapter.validate_python(results['top_anomalies'], from_attributes=True)
     
     return BatchAnalysisResponse(
         analysis_timestamp=datetime.utcnow(),
@@ -200,56 +262,12 @@ async def get_anomaly_types():
     """
     Get list of detectable anomaly types with descriptions.
     """
-    return {
-        "anomaly_types": [
-            {
-                "type": "orbital_maneuver",
-                "name": "Orbital Maneuver",
-                "description": "Detected velocity change indicating a deliberate orbit adjustment",
-                "typical_severity": "medium",
-                "detection_method": "Velocity delta analysis"
-            },
-            {
-                "type": "altitude_deviation",
-                "name": "Altitude Deviation",
-                "description": "Satellite altitude differs significantly from expected orbital parameters",
-                "typical_severity": "low to high",
-                "detection_method": "Position comparison with expected orbit"
-            },
-            {
-                "type": "rapid_decay",
-                "name": "Rapid Orbital Decay",
-                "description": "Faster than expected altitude loss, may indicate imminent re-entry",
-                "typical_severity": "high to critical",
-                "detection_method": "Altitude change rate analysis"
-            },
-            {
-                "type": "altitude_increase",
-                "name": "Unexpected Altitude Increase",
-                "description": "Altitude gain without detected maneuver",
-                "typical_severity": "medium",
-                "detection_method": "Position trend analysis"
-            },
-            {
-                "type": "potential_tumbling",
-                "name": "Potential Tumbling",
-                "description": "Velocity variations suggest attitude control issues",
-                "typical_severity": "low",
-                "detection_method": "Velocity variance analysis"
-            },
-            {
-                "type": "debris_proximity",
-                "name": "Debris Proximity Alert",
-                "description": "Tracked debris approaching satellite",
-                "typical_severity": "high to critical",
-                "detection_method": "Conjunction analysis"
-            }
-        ]
-    }
+    return Response(content=ANOMALY_TYPES_PAYLOAD, media_type="application/json")
 
 
 @router.get("/recent")
 async def get_recent_anomalies(
+    response: Response,
     hours: int = Query(24, ge=1, le=168),
     severity: Optional[Severity] = None,
     anomaly_type: Optional[AnomalyType] = None,
@@ -258,25 +276,14 @@ async def get_recent_anomalies(
     """
     Get recently detected anomalies across all monitored satellites.
     
-    This is a simulated endpoint that would normally pull from a database
-    of continuously monitored anomaly events.
+    Served from the background anomaly monitor, which re-analyzes a
+    sample of the catalog every 10 minutes and after each TLE refresh.
     """
-    # In production, this would query a database of detected anomalies
-    # For now, we'll run a quick batch analysis
-    satellites = cache.get_all_satellites()
-    sat_dicts = [
-        {
-            'norad_id': s.norad_id,
-            'name': s.name,
-            'line1': s.line1,
-            'line2': s.line2,
-            'altitude': s.altitude or 400
-        }
-        for s in satellites[:50]  # Quick sample
-        if s.line1 and s.line2
-    ]
+    results = await anomaly_monitor.get_results()
     
-    results = anomaly_detector.batch_analyze(sat_dicts, 50)
+    # Results stay current until the next monitor run
+    max_age = anomaly_monitor.interval - (datetime.utcnow() - anomaly_monitor.analyzed_at)
+    response.headers["Cache-Control"] = f"max-age={max(int(max_age.total_seconds()), 0)}"
     
     # Filter results
     anomalies = results['top_anomalies']
@@ -294,20 +301,7 @@ async def get_recent_anomalies(
             "anomaly_type": anomaly_type.value if anomaly_type else None,
         },
         "count": len(anomalies[:limit]),
-        "anomalies": [
-            {
-                "norad_id": a.norad_id,
-                "satellite_name": a.satellite_name,
-                "anomaly_type": a.anomaly_type,
-                "severity": a.severity,
-                "confidence": a.confidence,
-                "detected_at": a.detected_at.isoformat(),
-                "description": a.description,
-                "details": a.details,
-                "recommended_action": a.recommended_action
-            }
-            for a in anomalies[:limit]
-        ]
+        "anomalies": [a.to_dict() for a in anomalies[:limit]]
     }
 
 
@@ -316,43 +310,16 @@ async def get_anomaly_statistics():
     """
     Get overall anomaly detection statistics.
     """
-    satellites = cache.get_all_satellites()
-    
-    return {
-        "system_status": "operational",
-        "monitoring": {
-            "total_satellites_tracked": len(satellites),
-            "active_monitoring": True,
-            "detection_algorithms": [
-                "velocity_change_detection",
-                "altitude_deviation_analysis",
-                "decay_rate_prediction",
-                "tumbling_detection",
-                "conjunction_analysis"
-            ],
-            "update_frequency_minutes": 10
-        },
-        "thresholds": {
-            "altitude_change_km": 5.0,
-            "velocity_change_m_s": 50,
-            "maneuver_delta_v_m_s": 100,
-            "debris_proximity_km": 10.0
-        },
-        "ml_models": {
-            "maneuver_classifier": {
-                "status": "active",
-                "accuracy": 0.89,
-                "last_updated": "2026-01-01"
-            },
-            "decay_predictor": {
-                "status": "active",
-                "accuracy": 0.82,
-                "last_updated": "2026-01-01"
-            },
-            "anomaly_scorer": {
-                "status": "active",
-                "accuracy": 0.91,
-                "last_updated": "2026-01-01"
-            }
+    # Only the tracked satellite count changes, and only when TLEs are refreshed
+    global _statistics_payload
+    snapshot = cache.snapshot
+    last_update = snapshot.last_update
+    if _statistics_payload is None or _statistics_payload[0] != last_update:
+        statistics = dict(ANOMALY_STATISTICS)
+        statistics["monitoring"] = {
+            **ANOMALY_STATISTICS["monitoring"],
+            "total_satellites_tracked": len(snapshot.satellites),
         }
-    }
+        _statistics_payload = (last_update, orjson.dumps(statistics))
+    
+    return Response(content=_statistics_payload[1], media_type="application/json")
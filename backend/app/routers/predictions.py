@@ -8,10 +8,13 @@ from pydantic import BaseModel
 from datetime import datetime, timedelta
 import math
 
-from sgp4.api import Satrec, jday
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from sgp4.api import Satrec
 from sgp4.api import WGS72
 
 from app.services.cache import cache
+from app.services.position_grid import jday_grid
 
 router = APIRouter()
 
@@ -38,48 +41,26 @@ class OrbitPredictionResponse(BaseModel):
     name: str
     positions: List[PositionResponse]
     orbital_period_minutes: float
-    
-
-def tle_to_satrec(line1: str, line2: str) -> Satrec:
-    """Convert TLE to SGP4 satellite record"""
-    return Satrec.twoline2rv(line1, line2)
 
 
-def propagate_satellite(satrec: Satrec, dt: datetime) -> dict:
-    """Propagate satellite position to given datetime"""
-    
-    # Convert datetime to Julian date
-    jd, fr = jday(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second + dt.microsecond / 1e6)
-    
-    # Propagate
-    e, r, v = satrec.sgp4(jd, fr)
+def propagate_satellite_array(satrec: Satrec, jd: np.ndarray, fr: np.ndarray) -> dict:
+    """Propagate satellite over arrays of Julian dates; "ok" flags epochs without SGP4 errors"""
+    e, r, v = satrec.sgp4_array(jd, fr)
+    x, y, z = r.T
     
-    if e != 0:
-        return None
+    velocity = np.sqrt(np.einsum("ij,ij->i", v, v))
     
-    # r is position in km (TEME frame), v is velocity in km/s
-    x, y, z = r
-    vx, vy, vz = v
-    
-    # Calculate velocity magnitude
-    velocity = math.sqrt(vx**2 + vy**2 + vz**2)
-    
-    # Convert TEME to geodetic (simplified)
-    # For accurate conversion, we'd need proper frame transformations
-    r_mag = math.sqrt(x**2 + y**2 + z**2)
+    r_mag = np.sqrt(np.einsum("ij,ij->i", r, r))
     altitude = r_mag - EARTH_RADIUS_KM
     
-    # Approximate lat/lon
-    latitude = math.degrees(math.asin(z / r_mag))
-    longitude = math.degrees(math.atan2(y, x))
+    latitude = np.degrees(np.arcsin(z / r_mag))
+    longitude = np.degrees(np.arctan2(y, x))
     
-    # Adjust longitude for Earth rotation (simplified)
-    gmst = calculate_gmst(jd + fr)
-    longitude = (longitude - gmst) % 360
-    if longitude > 180:
-        longitude -= 360
+    longitude = (longitude - calculate_gmst(jd + fr)) % 360
+    longitude = np.where(longitude > 180, longitude - 360, longitude)
     
     return {
+        "ok": e == 0,
         "x": x,
         "y": y,
         "z": z,
@@ -90,6 +71,12 @@ def propagate_satellite(satrec: Satrec, dt: datetime) -> dict:
     }
 
 
+def propagate_satellite_grid(satrec: Satrec, start: datetime, step: timedelta, count: int) -> dict:
+    """Propagate satellite to `count` evenly spaced datetimes from start (see propagate_satellite_array)"""
+    jd, fr = jday_grid(start, step, count)
+    return propagate_satellite_array(satrec, jd, fr)
+
+
 def calculate_gmst(jd: float) -> float:
     """Calculate Greenwich Mean Sidereal Time in degrees"""
     t = (jd - 2451545.0) / 36525.0
@@ -109,32 +96,33 @@ async def predict_orbit(
     if not satellite:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    # Create SGP4 satellite record
-    try:
-        satrec = tle_to_satrec(satellite.line1, satellite.line2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse TLE: {e}")
+    # Parsed SGP4 satellite record from the cache
+    satrec = cache.get_satrec(norad_id)
+    if satrec is None:
+        raise HTTPException(status_code=500, detail="Failed to parse TLE")
     
-    # Generate positions
+    # Generate positions for every point in a single SGP4 array call
     now = datetime.utcnow()
-    positions = []
     time_step = timedelta(hours=hours) / points
     
-    for i in range(points):
-        dt = now + time_step * i
-        pos = propagate_satellite(satrec, dt)
-        
-        if pos:
-            positions.append(PositionResponse(
-                timestamp=dt,
-                latitude=pos["latitude"],
-                longitude=pos["longitude"],
-                altitude=pos["altitude"],
-                velocity=pos["velocity"],
-                x=pos["x"],
-                y=pos["y"],
-                z=pos["z"],
-            ))
+    pos = await run_in_threadpool(propagate_satellite_grid, satrec, now, time_step, points)
+    
+    positions = [
+        PositionResponse(
+            timestamp=now + time_step * i,
+            latitude=latitude,
+            longitude=longitude,
+            altitude=altitude,
+            velocity=velocity,
+            x=x,
+            y=y,
+            z=z,
+        )
+        for i, latitude, longitude, altitude, velocity, x, y, z in zip(
+            np.flatnonzero(pos["ok"]).tolist(),
+            *(pos[key][pos["ok"]].tolist() for key in ("latitude", "longitude", "altitude", "velocity", "x", "y", "z")),
+        )
+    ]
     
     return OrbitPredictionResponse(
         norad_id=norad_id,
@@ -152,16 +140,17 @@ async def get_current_position(norad_id: int):
     if not satellite:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    try:
-        satrec = tle_to_satrec(satellite.line1, satellite.line2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse TLE: {e}")
+    satrec = cache.get_satrec(norad_id)
+    if satrec is None:
+        raise HTTPException(status_code=500, detail="Failed to parse TLE")
     
+    # Single-epoch case of the array propagation used by the other endpoints
     now = datetime.utcnow()
-    pos = propagate_satellite(satrec, now)
+    pos = propagate_satellite_grid(satrec, now, timedelta(0), 1)
     
-    if not pos:
+    if not pos["ok"][0]:
         raise HTTPException(status_code=500, detail="Failed to propagate satellite position")
+    pos = {key: float(values[0]) for key, values in pos.items() if key != "ok"}
     
     return {
         "norad_id": norad_id,
@@ -181,6 +170,55 @@ async def get_current_position(norad_id: int):
     }
 
 
+def compute_passes(satrec: Satrec, lat: float, lon: float, hours: float,
+                   min_elevation: float) -> List[dict]:
+    """Find up to 10 passes above min_elevation over the next `hours` (CPU-bound)"""
+    
+    # Simplified pass prediction
+    # For accurate predictions, we'd need proper visibility calculations
+    now = datetime.utcnow()
+    time_step = timedelta(minutes=1)
+    steps = int(hours * 60)
+    
+    # Propagate the whole window in one SGP4 array call; epochs that fail are skipped
+    pos = propagate_satellite_grid(satrec, now, time_step, steps)
+    epochs = np.flatnonzero(pos["ok"])
+    
+    # Calculate elevation angle (simplified)
+    sat_lat = np.radians(pos["latitude"][epochs])
+    sat_lon = np.radians(pos["longitude"][epochs])
+    obs_lat = math.radians(lat)
+    obs_lon = math.radians(lon)
+    
+    # Angular distance
+    cos_angle = (math.sin(obs_lat) * np.sin(sat_lat) +
+                 math.cos(obs_lat) * np.cos(sat_lat) * np.cos(sat_lon - obs_lon))
+    angle = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
+    
+    # Approximate elevation (very simplified)
+    elevation = np.where(pos["altitude"][epochs] > 100, 90 - angle, 0)
+    
+    # A pass runs from a rise edge to the next set edge; one still open at the end is dropped
+    edges = np.diff((elevation > min_elevation).astype(np.int8), prepend=0)
+    rises = np.flatnonzero(edges == 1)
+    sets = np.flatnonzero(edges == -1)
+    
+    passes = []
+    for rise, set_ in list(zip(rises.tolist(), sets.tolist()))[:10]:  # Limit to 10 passes
+        peak = rise + int(np.argmax(elevation[rise:set_]))
+        pass_start = now + time_step * int(epochs[rise])
+        pass_end = now + time_step * int(epochs[set_])
+        passes.append({
+            "start": pass_start.isoformat(),
+            "end": pass_end.isoformat(),
+            "max_elevation": round(float(elevation[peak]), 1),
+            "max_elevation_time": (now + time_step * int(epochs[peak])).isoformat(),
+            "duration_minutes": (pass_end - pass_start).total_seconds() / 60,
+        })
+    
+    return passes
+
+
 @router.get("/passes/{norad_id}")
 async def get_satellite_passes(
     norad_id: int,
@@ -195,65 +233,12 @@ async def get_satellite_passes(
     if not satellite:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    try:
-        satrec = tle_to_satrec(satellite.line1, satellite.line2)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse TLE: {e}")
-    
-    # Simplified pass prediction
-    # For accurate predictions, we'd need proper visibility calculations
-    passes = []
-    now = datetime.utcnow()
-    time_step = timedelta(minutes=1)
-    
-    in_pass = False
-    pass_start = None
-    max_elevation = 0
-    max_elevation_time = None
+    satrec = cache.get_satrec(norad_id)
+    if satrec is None:
+        raise HTTPException(status_code=500, detail="Failed to parse TLE")
     
-    for i in range(int(hours * 60)):
-        dt = now + time_step * i
-        pos = propagate_satellite(satrec, dt)
-        
-        if pos:
-            # Calculate elevation angle (simplified)
-            sat_lat = math.radians(pos["latitude"])
-            sat_lon = math.radians(pos["longitude"])
-            obs_lat = math.radians(lat)
-            obs_lon = math.radians(lon)
-            
-            # Angular distance
-            dlon = sat_lon - obs_lon
-            cos_angle = (math.sin(obs_lat) * math.sin(sat_lat) + 
-                        math.cos(obs_lat) * math.cos(sat_lat) * math.cos(dlon))
-            angle = math.degrees(math.acos(max(-1, min(1, cos_angle))))
-            
-            # Approximate elevation (very simplified)
-            elevation = 90 - angle if pos["altitude"] > 100 else 0
-            
-            if elevation > min_elevation:
-                if not in_pass:
-                    in_pass = True
-                    pass_start = dt
-                    max_elevation = elevation
-                    max_elevation_time = dt
-                elif elevation > max_elevation:
-                    max_elevation = elevation
-                    max_elevation_time = dt
-            else:
-                if in_pass:
-                    passes.append({
-                        "start": pass_start.isoformat(),
-                        "end": dt.isoformat(),
-                        "max_elevation": round(max_elevation, 1),
-                        "max_elevation_time": max_elevation_time.isoformat(),
-                        "duration_minutes": (dt - pass_start).total_seconds() / 60,
-                    })
-                    in_pass = False
-                    max_elevation = 0
-        
-        if len(passes) >= 10:  # Limit to 10 passes
-            break
+    # Scan the prediction window off the event loop
+    passes = await run_in_threadpool(compute_passes, satrec, lat, lon, hours, min_elevation)
     
     return {
         "norad_id": norad_id,
@@ -2,15 +2,55 @@
 Satellite data endpoints
 """
 
-from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Callable, Dict, List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.services.cache import cache, SatelliteData
+import struct
+import zlib
+
+import numpy as np
+import orjson
+
+from app.services.cache import cache, CacheSnapshot, SatelliteData, TLE_CATEGORIES
+from app.responses import ORJSONResponse
 
 router = APIRouter()
 
+# Serialized bulk payloads keyed by endpoint, as (cache.last_update, encoded bytes)
+_payload_cache: Dict[str, tuple] = {}
+
+# Gzipped bulk payloads keyed by endpoint, as (encoded bytes, raw deflate, CRC-32, length)
+_gzip_cache: Dict[str, tuple] = {}
+
+# Bulk payloads are deflated once per refresh and wrapped in a gzip member per response
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"  # No file name or mtime
+GZIP_TRAILER = struct.Struct("<II")  # CRC-32 and length mod 2**32 of the uncompressed data
+GZIP_LEVEL = 6
+
+# Binary /tle/all.bin layout (little-endian): header, then one fixed-stride record per satellite
+TLE_BINARY_HEADER_DTYPE = np.dtype([("count", "<u4"), ("timestamp", "<u8")])  # ms since Unix epoch
+TLE_BINARY_RECORD_DTYPE = np.dtype([
+    ("norad_id", "<i4"),
+    ("type", "u1"),  # Index into the X-Satellite-Types header
+    ("name", "S24"),
+    ("line1", "S69"),
+    ("line2", "S69"),
+])
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+# Slice size for streaming cached bulk payloads
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Catalog responses may be reused briefly, then revalidated against the ETag
+CATALOG_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+# Altitude classes and their upper bounds in km (heo is everything from 36500 km up)
+ALTITUDE_CLASSES = ("leo", "meo", "geo", "heo")
+ALTITUDE_CLASS_BOUNDS_KM = np.array([2000.0, 35786.0, 36500.0])
+
 
 class SatelliteResponse(BaseModel):
     """Satellite response model"""
@@ -35,8 +75,40 @@ class SatelliteListResponse(BaseModel):
     timestamp: datetime
 
 
-@router.get("/", response_model=SatelliteListResponse)
+def catalog_headers() -> Dict[str, str]:
+    """
+    Validator headers for responses that only change when the TLE cache refreshes.
+    The ETag comes from the catalog contents, so every worker process agrees on it.
+    """
+    return {"ETag": f'W/"{cache.snapshot.version}"', "Cache-Control": CATALOG_CACHE_CONTROL}
+
+
+def not_modified(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """A 304 response if the client already holds the current catalog version"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def satellite_dict(sat: SatelliteData) -> dict:
+    """SatelliteResponse fields of a cached satellite (cache data is already validated)"""
+    return {
+        "norad_id": sat.norad_id,
+        "name": sat.name,
+        "line1": sat.line1,
+        "line2": sat.line2,
+        "satellite_type": sat.satellite_type,
+        "altitude": sat.altitude,
+        "inclination": sat.inclination,
+        "eccentricity": sat.eccentricity,
+        "period": sat.period,
+    }
+
+
+@router.get("/", response_model=SatelliteListResponse, response_class=ORJSONResponse)
 async def get_satellites(
+    request: Request,
     limit: int = Query(1000, ge=1, le=20000),
     offset: int = Query(0, ge=0),
     type: Optional[str] = Query(None, description="Filter by type: satellite, station, debris, rocket-body"),
@@ -45,6 +117,11 @@ async def get_satellites(
 ):
     """Get list of satellites with optional filtering"""
     
+    headers = catalog_headers()
+    cached = not_modified(request, headers)
+    if cached:
+        return cached
+    
     satellites = cache.filter_satellites(
         sat_type=type,
         min_altitude=min_altitude,
@@ -55,14 +132,15 @@ async def get_satellites(
     # Apply offset
     satellites = satellites[offset:offset + limit]
     
-    return SatelliteListResponse(
-        satellites=[SatelliteResponse(**vars(sat)) for sat in satellites],
-        total=len(cache.satellites),
-        timestamp=datetime.utcnow(),
-    )
+    # Build plain dicts and render directly, skipping per-record model validation
+    return ORJSONResponse({
+        "satellites": [satellite_dict(sat) for sat in satellites],
+        "total": len(cache.satellites),
+        "timestamp": datetime.utcnow().isoformat(),
+    }, headers=headers)
 
 
-@router.get("/search")
+@router.get("/search", response_class=ORJSONResponse)
 async def search_satellites(
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(50, ge=1, le=200),
@@ -71,11 +149,11 @@ async def search_satellites(
     
     satellites = cache.search_satellites(q, limit=limit)
     
-    return {
+    return ORJSONResponse({
         "query": q,
-        "results": [SatelliteResponse(**vars(sat)) for sat in satellites],
+        "results": [satellite_dict(sat) for sat in satellites],
         "count": len(satellites),
-    }
+    })
 
 
 @router.get("/{norad_id}", response_model=SatelliteResponse)
@@ -87,7 +165,7 @@ async def get_satellite(norad_id: int):
     if not satellite:
         raise HTTPException(status_code=404, detail=f"Satellite {norad_id} not found")
     
-    return SatelliteResponse(**vars(satellite))
+    return SatelliteResponse.model_validate(satellite)
 
 
 @router.get("/{norad_id}/tle")
@@ -108,123 +186,220 @@ async def get_satellite_tle(norad_id: int):
     }
 
 
-@router.get("/tle/all")
-async def get_all_tle():
+def cached_payload(key: str, build: Callable[[CacheSnapshot], object],
+                   encode: Callable[[object], bytes] = orjson.dumps) -> bytes:
+    """Encode build(snapshot) once and reuse the bytes until the satellite cache refreshes"""
+    snapshot = cache.snapshot
+    entry = _payload_cache.get(key)
+    if entry is None or entry[0] != snapshot.last_update:
+        entry = (snapshot.last_update, encode(build(snapshot)))
+        _payload_cache[key] = entry
+    return entry[1]
+
+
+def raw_deflate(data: bytes, final: bool) -> bytes:
     """
-    Get ALL TLE data for frontend visualization.
-    Returns compact format optimized for bulk loading.
+    Raw deflate data. A non-final block ends on a full flush, so another
+    independently compressed stream can follow it directly.
     """
-    satellites = cache.get_all_satellites()
-    
-    # Return compact TLE format for efficient transfer
-    tle_data = []
-    for sat in satellites:
-        tle_data.append({
-            "n": sat.name,  # name (shortened key)
-            "id": sat.norad_id,
-            "l1": sat.line1,
-            "l2": sat.line2,
-            "t": sat.satellite_type,
-        })
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_FULL_FLUSH)
+
+
+def cached_gzip(key: str, build: Callable[[CacheSnapshot], object],
+                encode: Callable[[object], bytes] = orjson.dumps, skip: int = 0) -> tuple:
+    """(raw deflate, CRC-32, length) of cached_payload(...)[skip:], compressed once per refresh"""
+    body = cached_payload(key, build, encode)
+    entry = _gzip_cache.get(key)
+    if entry is None or entry[0] is not body:
+        tail = memoryview(body)[skip:]
+        entry = (body, raw_deflate(tail, final=True), zlib.crc32(tail), len(tail))
+        _gzip_cache[key] = entry
+    return entry[1:]
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether the client accepts gzip (the same test GZipMiddleware applies)"""
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def slices(data: bytes, start: int = 0):
+    """data[start:] in STREAM_CHUNK_BYTES pieces"""
+    for offset in range(start, len(data), STREAM_CHUNK_BYTES):
+        yield data[offset:offset + STREAM_CHUNK_BYTES]
+
+
+def payload_response(request: Request, key: str, build: Callable[[CacheSnapshot], object],
+                     headers: Dict[str, str], media_type: str = "application/json",
+                     encode: Callable[[object], bytes] = orjson.dumps,
+                     timestamped: bool = False) -> Response:
+    """
+    Send a cached bulk payload, pre-gzipped for clients that accept gzip.
+    
+    With timestamped, the payload is a JSON object and a fresh "timestamp" field is
+    spliced in front of it; the gzip member then starts with that prefix deflated on
+    its own, followed by the cached deflate of the rest of the object.
+    """
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    prefix = b'{"timestamp":' + orjson.dumps(datetime.utcnow().isoformat()) + b"," if timestamped else b""
+    skip = 1 if timestamped else 0  # The cached object's opening brace
+    
+    if accepts_gzip(request):
+        deflated, crc, size = cached_gzip(key, build, encode, skip)
+        if prefix:
+            crc = zlib.crc32(memoryview(cached_payload(key, build, encode))[skip:], zlib.crc32(prefix))
+        
+        async def chunks():
+            yield GZIP_HEADER + (raw_deflate(prefix, final=False) if prefix else b"")
+            for chunk in slices(deflated):
+                yield chunk
+            yield GZIP_TRAILER.pack(crc, (len(prefix) + size) & 0xFFFFFFFF)
+        
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+    
+    body = cached_payload(key, build, encode)
+    if not prefix:
+        return Response(content=body, media_type=media_type, headers=headers)
+    
+    # Stream the cached bytes in slices, so no per-request copy of the whole payload is made
+    async def chunks():
+        yield prefix
+        for chunk in slices(body, skip):
+            yield chunk
+    
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
+def build_all_tle(snapshot: CacheSnapshot) -> dict:
+    """Compact TLE payload for every cached satellite"""
+    # Compact records (shortened keys) are prebuilt by the cache on refresh
+    tle_data = snapshot.tle_entries
+    last_update = snapshot.last_update
     
     return {
         "count": len(tle_data),
-        "timestamp": datetime.utcnow().isoformat(),
-        "last_update": cache.last_update.isoformat() if cache.last_update else None,
+        "last_update": last_update.isoformat() if last_update else None,
         "satellites": tle_data,
     }
 
 
+def build_all_tle_binary(snapshot: CacheSnapshot) -> bytes:
+    """Packed TLE records for every cached satellite"""
+    entries = snapshot.tle_entries
+    last_update = snapshot.last_update
+    
+    header = np.zeros(1, dtype=TLE_BINARY_HEADER_DTYPE)
+    header["count"] = len(entries)
+    header["timestamp"] = (last_update - UNIX_EPOCH) // timedelta(milliseconds=1) if last_update else 0
+    
+    records = np.zeros(len(entries), dtype=TLE_BINARY_RECORD_DTYPE)
+    records["norad_id"] = snapshot.columns.norad_ids
+    records["type"] = snapshot.columns.type_codes
+    records["name"] = [entry["n"].encode("ascii", "replace")[:24] for entry in entries]
+    records["line1"] = [entry["l1"].encode("ascii", "replace") for entry in entries]
+    records["line2"] = [entry["l2"].encode("ascii", "replace") for entry in entries]
+    
+    return header.tobytes() + records.tobytes()
+
+
+def build_tle_categories(snapshot: CacheSnapshot) -> dict:
+    """Compact TLE payload grouped into loading categories"""
+    entries = snapshot.tle_entries
+    last_update = snapshot.last_update
+    
+    # Categories are assigned once per refresh by the cache
+    buckets = [[] for _ in TLE_CATEGORIES]
+    for entry, code in zip(entries, snapshot.tle_category_codes):
+        buckets[code].append(entry)
+    
+    return {
+        "last_update": last_update.isoformat() if last_update else None,
+        "categories": {
+            name: {"count": len(bucket), "satellites": bucket}
+            for name, bucket in zip(TLE_CATEGORIES, buckets)
+        },
+        "total": len(entries),
+    }
+
+
+@router.get("/tle/all")
+async def get_all_tle(request: Request):
+    """
+    Get ALL TLE data for frontend visualization.
+    Returns compact format optimized for bulk loading.
+    """
+    # The payload only changes when TLEs are refreshed
+    headers = catalog_headers()
+    return not_modified(request, headers) or payload_response(
+        request, "tle_all", build_all_tle, headers, timestamped=True
+    )
+
+
+@router.get("/tle/all.bin")
+async def get_all_tle_binary(request: Request):
+    """
+    Get ALL TLE data as packed binary records.
+    Same content as /tle/all in a fixed-stride layout the frontend can
+    decode without JSON parsing: a 12-byte header (count u32, last update
+    u64 ms) followed by 167-byte records (norad_id i32, type u8, name,
+    line1 and line2 as NUL-padded ASCII).
+    """
+    headers = catalog_headers()
+    return not_modified(request, headers) or payload_response(
+        request, "tle_all_binary", build_all_tle_binary,
+        {**headers, "X-Satellite-Types": ",".join(cache.columns.type_names)},
+        media_type="application/octet-stream", encode=bytes,
+    )
+
+
 @router.get("/tle/categories")
-async def get_tle_by_category():
+async def get_tle_by_category(request: Request):
     """
     Get TLE data organized by category for chunked loading.
     Frontend can load critical satellites first, then bulk.
     """
-    satellites = cache.get_all_satellites()
-    
-    categories = {
-        "stations": [],      # Space stations (highest priority)
-        "special": [],       # Hubble, etc.
-        "gps": [],           # Navigation
-        "starlink": [],      # Starlink constellation
-        "oneweb": [],        # OneWeb constellation
-        "iridium": [],       # Iridium constellation
-        "other_active": [],  # Other active satellites
-        "debris": [],        # Debris
-        "rocket_bodies": [], # Rocket bodies
-    }
+    headers = catalog_headers()
+    return not_modified(request, headers) or payload_response(
+        request, "tle_categories", build_tle_categories, headers, timestamped=True
+    )
+
+
+def build_stats(snapshot: CacheSnapshot) -> dict:
+    """Satellite counts by type and altitude class from the cache columns"""
+    columns = snapshot.columns
+    last_update = snapshot.last_update
+    type_codes = columns.type_codes
+    altitudes = columns.altitudes
+    type_names = columns.type_names
     
-    for sat in satellites:
-        name_upper = sat.name.upper()
-        entry = {
-            "n": sat.name,
-            "id": sat.norad_id,
-            "l1": sat.line1,
-            "l2": sat.line2,
-            "t": sat.satellite_type,
-        }
-        
-        if sat.satellite_type == "station" or "ISS" in name_upper or "TIANGONG" in name_upper or "CSS" in name_upper:
-            categories["stations"].append(entry)
-        elif "HUBBLE" in name_upper or "HST" in name_upper:
-            categories["special"].append(entry)
-        elif "GPS" in name_upper or "NAVSTAR" in name_upper:
-            categories["gps"].append(entry)
-        elif "STARLINK" in name_upper:
-            categories["starlink"].append(entry)
-        elif "ONEWEB" in name_upper:
-            categories["oneweb"].append(entry)
-        elif "IRIDIUM" in name_upper:
-            categories["iridium"].append(entry)
-        elif sat.satellite_type == "debris":
-            categories["debris"].append(entry)
-        elif sat.satellite_type == "rocket-body":
-            categories["rocket_bodies"].append(entry)
-        else:
-            categories["other_active"].append(entry)
+    # Count by type, listing types in order of first appearance in the catalog
+    type_counts = np.bincount(type_codes, minlength=len(type_names))
+    present, first_seen = np.unique(type_codes, return_index=True)
+    by_type = {}
+    for code in present[np.argsort(first_seen)].tolist():
+        sat_type = type_names[code] or "unknown"
+        by_type[sat_type] = by_type.get(sat_type, 0) + int(type_counts[code])
+    
+    # Count by altitude class, skipping unknown altitudes
+    known = altitudes[~np.isnan(altitudes)]
+    class_counts = np.bincount(
+        np.searchsorted(ALTITUDE_CLASS_BOUNDS_KM, known, side="right"),
+        minlength=len(ALTITUDE_CLASSES),
+    )
     
     return {
-        "timestamp": datetime.utcnow().isoformat(),
-        "last_update": cache.last_update.isoformat() if cache.last_update else None,
-        "categories": {k: {"count": len(v), "satellites": v} for k, v in categories.items()},
-        "total": len(satellites),
+        "total": len(type_codes),
+        "by_type": by_type,
+        "by_altitude": dict(zip(ALTITUDE_CLASSES, class_counts.tolist())),
+        "last_update": last_update.isoformat() if last_update else None,
     }
 
 
 @router.get("/stats/summary")
-async def get_stats():
+async def get_stats(request: Request):
     """Get satellite statistics"""
     
-    satellites = cache.get_all_satellites()
-    
-    stats = {
-        "total": len(satellites),
-        "by_type": {},
-        "by_altitude": {
-            "leo": 0,  # < 2000 km
-            "meo": 0,  # 2000-35786 km
-            "geo": 0,  # ~35786 km
-            "heo": 0,  # > 35786 km
-        }
-    }
-    
-    for sat in satellites:
-        # Count by type
-        sat_type = sat.satellite_type or "unknown"
-        stats["by_type"][sat_type] = stats["by_type"].get(sat_type, 0) + 1
-        
-        # Count by altitude
-        if sat.altitude is not None:
-            if sat.altitude < 2000:
-                stats["by_altitude"]["leo"] += 1
-            elif sat.altitude < 35786:
-                stats["by_altitude"]["meo"] += 1
-            elif sat.altitude < 36500:
-                stats["by_altitude"]["geo"] += 1
-            else:
-                stats["by_altitude"]["heo"] += 1
-    
-    stats["last_update"] = cache.last_update.isoformat() if cache.last_update else None
-    
-    return stats
+    # Counts only change when TLEs are refreshed
+    headers = catalog_headers()
+    return not_modified(request, headers) or payload_response(request, "stats_summary", build_stats, headers)
@@ -6,24 +6,65 @@ Uses statistical analysis and ML-inspired algorithms to detect unusual patterns
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+import heapq
 import math
 import numpy as np
 from collections import defaultdict
 
-from sgp4.api import Satrec, jday
+from sgp4.api import Satrec, SatrecArray
+
+from app.services import anomaly_kernels
+from app.services.cache import cache, CacheSnapshot, DEFAULT_EXPECTED_ALTITUDE_KM
+from app.services.position_grid import jday_grid
+
+# Sampling for batch analysis
+_rng = np.random.default_rng()
 
 
 @dataclass
 class OrbitalState:
     """Represents satellite orbital state at a point in time"""
     timestamp: datetime
-    position: Tuple[float, float, float]  # x, y, z in km
-    velocity: Tuple[float, float, float]  # vx, vy, vz in km/s
+    position: np.ndarray  # (3,) x, y, z in km
+    velocity: np.ndarray  # (3,) vx, vy, vz in km/s
     altitude: float
     speed: float
 
 
 @dataclass
+class OrbitalStates:
+    """Satellite orbital states over a series of epochs, one array row per epoch"""
+    timestamps: np.ndarray  # (N,) datetime64[us]
+    positions: np.ndarray  # (N, 3) float32 x, y, z in km
+    velocities: np.ndarray  # (N, 3) float32 vx, vy, vz in km/s
+    altitude: np.ndarray  # (N,) km
+    speed: np.ndarray  # (N,) km/s
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def state(self, i: int) -> OrbitalState:
+        """The single state at epoch i; position and velocity are views into the arrays"""
+        return OrbitalState(
+            timestamp=self.timestamps[i].item(),
+            position=self.positions[i],
+            velocity=self.velocities[i],
+            altitude=float(self.altitude[i]),
+            speed=float(self.speed[i]),
+        )
+    
+    def select(self, epochs: np.ndarray) -> "OrbitalStates":
+        """The states at the given epochs (boolean mask or indices)"""
+        return OrbitalStates(
+            timestamps=self.timestamps[epochs],
+            positions=self.positions[epochs],
+            velocities=self.velocities[epochs],
+            altitude=self.altitude[epochs],
+            speed=self.speed[epochs],
+        )
+
+
+@dataclass(slots=True)
 class AnomalyEvent:
     """Detected anomaly event"""
     norad_id: int
@@ -33,8 +74,30 @@ class AnomalyEvent:
     confidence: float  # 0.0 - 1.0
     detected_at: datetime
     description: str
-    details: Dict
+    metrics: Tuple[Tuple[str, Optional[float], int], ...]  # (detail key, raw value, decimals)
     recommended_action: str
+    
+    @property
+    def details(self) -> Dict:
+        """Rounded metrics; built only for the events that get serialized"""
+        return {
+            key: None if value is None else round(value, decimals)
+            for key, value, decimals in self.metrics
+        }
+    
+    def to_dict(self) -> Dict:
+        """JSON-ready form of the event"""
+        return {
+            "norad_id": self.norad_id,
+            "satellite_name": self.satellite_name,
+            "anomaly_type": self.anomaly_type,
+            "severity": self.severity,
+            "confidence": self.confidence,
+            "detected_at": self.detected_at.isoformat(),
+            "description": self.description,
+            "details": self.details,
+            "recommended_action": self.recommended_action,
+        }
 
 
 class AnomalyDetector:
@@ -54,92 +117,58 @@ class AnomalyDetector:
     MANEUVER_DETECTION_THRESHOLD = 0.1  # Delta-v threshold for maneuver
     DEBRIS_PROXIMITY_KM = 10.0  # Close debris approach
     
-    def __init__(self):
-        self.historical_data: Dict[int, List[OrbitalState]] = defaultdict(list)
-        self.anomalies: List[AnomalyEvent] = []
-        
-    def propagate_state(self, satrec: Satrec, dt: datetime) -> Optional[OrbitalState]:
-        """Propagate satellite to get orbital state at given time"""
-        try:
-            jd, fr = jday(dt.year, dt.month, dt.day, dt.hour, dt.minute, 
-                        dt.second + dt.microsecond / 1e6)
-            e, r, v = satrec.sgp4(jd, fr)
-            
-            if e != 0:
-                return None
-            
-            # Calculate derived values
-            altitude = math.sqrt(r[0]**2 + r[1]**2 + r[2]**2) - 6371.0
-            speed = math.sqrt(v[0]**2 + v[1]**2 + v[2]**2)
-            
-            return OrbitalState(
-                timestamp=dt,
-                position=tuple(r),
-                velocity=tuple(v),
-                altitude=altitude,
-                speed=speed
-            )
-        except Exception:
-            return None
-    
     def detect_maneuver(self, norad_id: int, name: str, 
-                       states: List[OrbitalState]) -> Optional[AnomalyEvent]:
+                       states: OrbitalStates) -> Optional[AnomalyEvent]:
         """
         Detect potential orbital maneuvers by analyzing velocity changes
         """
         if len(states) < 3:
             return None
         
-        for i in range(1, len(states) - 1):
-            prev_state = states[i - 1]
-            curr_state = states[i]
-            next_state = states[i + 1]
-            
-            # Calculate velocity changes
-            dv1 = self._velocity_magnitude(
-                curr_state.velocity[0] - prev_state.velocity[0],
-                curr_state.velocity[1] - prev_state.velocity[1],
-                curr_state.velocity[2] - prev_state.velocity[2]
-            )
-            
-            dv2 = self._velocity_magnitude(
-                next_state.velocity[0] - curr_state.velocity[0],
-                next_state.velocity[1] - curr_state.velocity[1],
-                next_state.velocity[2] - curr_state.velocity[2]
-            )
-            
-            # Sudden velocity change indicates maneuver
-            if dv1 > self.MANEUVER_DETECTION_THRESHOLD:
-                return AnomalyEvent(
-                    norad_id=norad_id,
-                    satellite_name=name,
-                    anomaly_type="orbital_maneuver",
-                    severity="medium",
-                    confidence=min(0.95, 0.5 + dv1 * 2),
-                    detected_at=curr_state.timestamp,
-                    description=f"Potential orbital maneuver detected: Δv ≈ {dv1*1000:.1f} m/s",
-                    details={
-                        "delta_v_km_s": round(dv1, 4),
-                        "delta_v_m_s": round(dv1 * 1000, 2),
-                        "altitude_km": round(curr_state.altitude, 2),
-                        "pre_maneuver_speed": round(prev_state.speed, 4),
-                        "post_maneuver_speed": round(curr_state.speed, 4),
-                    },
-                    recommended_action="Monitor for follow-up maneuvers. Update tracking parameters."
-                )
+        # The first sudden velocity change indicates a maneuver
+        dv = anomaly_kernels.velocity_changes(states.velocities)
+        first = int(anomaly_kernels.first_exceedance(dv, self.MANEUVER_DETECTION_THRESHOLD))
+        if first < 0:
+            return None
         
-        return None
+        i = first + 1
+        return self._maneuver_event(norad_id, name, float(dv[i - 1]), states.state(i - 1), states.state(i))
+    
+    def _maneuver_event(self, norad_id: int, name: str, dv1: float,
+                        prev_state: OrbitalState, curr_state: OrbitalState) -> AnomalyEvent:
+        """Build a maneuver event for a velocity change of dv1 km/s into curr_state"""
+        return AnomalyEvent(
+            norad_id=norad_id,
+            satellite_name=name,
+            anomaly_type="orbital_maneuver",
+            severity="medium",
+            confidence=min(0.95, 0.5 + dv1 * 2),
+            detected_at=curr_state.timestamp,
+            description=f"Potential orbital maneuver detected: Δv ≈ {dv1*1000:.1f} m/s",
+            metrics=(
+                ("delta_v_km_s", dv1, 4),
+                ("delta_v_m_s", dv1 * 1000, 2),
+                ("altitude_km", curr_state.altitude, 2),
+                ("pre_maneuver_speed", prev_state.speed, 4),
+                ("post_maneuver_speed", curr_state.speed, 4),
+            ),
+            recommended_action="Monitor for follow-up maneuvers. Update tracking parameters."
+        )
     
     def detect_altitude_anomaly(self, norad_id: int, name: str,
-                               states: List[OrbitalState],
+                               states: OrbitalStates,
                                expected_altitude: float) -> Optional[AnomalyEvent]:
         """
         Detect unexpected altitude changes
         """
-        if not states:
+        if not len(states):
             return None
         
-        latest = states[-1]
+        return self._altitude_event(norad_id, name, states.state(-1), expected_altitude)
+    
+    def _altitude_event(self, norad_id: int, name: str, latest: OrbitalState,
+                        expected_altitude: float) -> Optional[AnomalyEvent]:
+        """Build an altitude deviation event if latest strays from the expected altitude"""
         altitude_diff = abs(latest.altitude - expected_altitude)
         
         if altitude_diff > self.ALTITUDE_CHANGE_THRESHOLD_KM:
@@ -159,36 +188,37 @@ class AnomalyDetector:
                 confidence=min(0.95, 0.6 + altitude_diff / 200),
                 detected_at=latest.timestamp,
                 description=f"Altitude deviation of {altitude_diff:.1f} km from expected",
-                details={
-                    "expected_altitude_km": round(expected_altitude, 2),
-                    "actual_altitude_km": round(latest.altitude, 2),
-                    "deviation_km": round(altitude_diff, 2),
-                    "deviation_percent": round(altitude_diff / expected_altitude * 100, 2) if expected_altitude > 0 else 0,
-                },
+                metrics=(
+                    ("expected_altitude_km", expected_altitude, 2),
+                    ("actual_altitude_km", latest.altitude, 2),
+                    ("deviation_km", altitude_diff, 2),
+                    ("deviation_percent", altitude_diff / expected_altitude * 100 if expected_altitude > 0 else 0, 2),
+                ),
                 recommended_action="Verify TLE data freshness. Check for recent maneuvers."
             )
         
         return None
     
     def detect_decay_anomaly(self, norad_id: int, name: str,
-                            states: List[OrbitalState]) -> Optional[AnomalyEvent]:
+                            states: OrbitalStates) -> Optional[AnomalyEvent]:
         """
         Detect unusual orbital decay patterns
         """
         if len(states) < 2:
             return None
         
-        # Calculate decay rate
-        first_state = states[0]
-        last_state = states[-1]
-        
-        time_diff_days = (last_state.timestamp - first_state.timestamp).total_seconds() / 86400
+        # Calculate decay rate between the first and last epoch
+        time_diff_days = (states.timestamps[-1] - states.timestamps[0]) / np.timedelta64(1, "D")
         if time_diff_days < 0.01:
             return None
         
-        altitude_change = last_state.altitude - first_state.altitude
-        decay_rate = altitude_change / time_diff_days  # km/day
+        decay_rate = float(anomaly_kernels.decay_rates(states.altitude, time_diff_days))  # km/day
         
+        return self._decay_event(norad_id, name, decay_rate, states.state(-1))
+    
+    def _decay_event(self, norad_id: int, name: str, decay_rate: float,
+                     last_state: OrbitalState) -> Optional[AnomalyEvent]:
+        """Build a decay or climb event for an altitude change rate in km/day"""
         # Unusual decay (rapid descent or unexpected climb)
         if decay_rate < -10:  # Rapid decay
             return AnomalyEvent(
@@ -199,11 +229,11 @@ class AnomalyDetector:
                 confidence=0.85,
                 detected_at=last_state.timestamp,
                 description=f"Rapid orbital decay detected: {abs(decay_rate):.1f} km/day",
-                details={
-                    "decay_rate_km_day": round(decay_rate, 2),
-                    "current_altitude_km": round(last_state.altitude, 2),
-                    "estimated_days_to_reentry": round(last_state.altitude / abs(decay_rate), 1) if decay_rate != 0 else None,
-                },
+                metrics=(
+                    ("decay_rate_km_day", decay_rate, 2),
+                    ("current_altitude_km", last_state.altitude, 2),
+                    ("estimated_days_to_reentry", last_state.altitude / abs(decay_rate) if decay_rate != 0 else None, 1),
+                ),
                 recommended_action="Immediate attention required. Potential re-entry imminent."
             )
         elif decay_rate > 0.5:  # Unexpected climb without maneuver
@@ -215,17 +245,17 @@ class AnomalyDetector:
                 confidence=0.75,
                 detected_at=last_state.timestamp,
                 description=f"Unexpected altitude increase: {decay_rate:.2f} km/day",
-                details={
-                    "altitude_change_rate_km_day": round(decay_rate, 2),
-                    "current_altitude_km": round(last_state.altitude, 2),
-                },
+                metrics=(
+                    ("altitude_change_rate_km_day", decay_rate, 2),
+                    ("current_altitude_km", last_state.altitude, 2),
+                ),
                 recommended_action="Investigate possible undetected maneuver or tracking error."
             )
         
         return None
     
     def detect_tumbling(self, norad_id: int, name: str,
-                       states: List[OrbitalState]) -> Optional[AnomalyEvent]:
+                       states: OrbitalStates) -> Optional[AnomalyEvent]:
         """
         Detect potential tumbling behavior (simulated based on velocity variations)
         """
@@ -233,9 +263,14 @@ class AnomalyDetector:
             return None
         
         # Calculate velocity variance
-        speeds = [s.speed for s in states]
-        mean_speed = sum(speeds) / len(speeds)
-        variance = sum((s - mean_speed) ** 2 for s in speeds) / len(speeds)
+        mean_speed, variance = anomaly_kernels.speed_moments(states.speed)
+        mean_speed, variance = float(mean_speed), float(variance)
+        
+        return self._tumbling_event(norad_id, name, mean_speed, variance, states.timestamps[-1].item())
+    
+    def _tumbling_event(self, norad_id: int, name: str, mean_speed: float,
+                        variance: float, detected_at: datetime) -> Optional[AnomalyEvent]:
+        """Build a tumbling event if the speed varies too much around its mean"""
         std_dev = math.sqrt(variance)
         
         # High variance in speed might indicate tumbling
@@ -248,14 +283,14 @@ class AnomalyDetector:
                 anomaly_type="potential_tumbling",
                 severity="low",
                 confidence=min(0.8, 0.4 + coefficient_of_variation * 100),
-                detected_at=states[-1].timestamp,
+                detected_at=detected_at,
                 description="Velocity variations suggest potential attitude anomaly",
-                details={
-                    "speed_variance": round(variance, 8),
-                    "speed_std_dev": round(std_dev, 6),
-                    "coefficient_of_variation": round(coefficient_of_variation, 6),
-                    "mean_speed_km_s": round(mean_speed, 4),
-                },
+                metrics=(
+                    ("speed_variance", variance, 8),
+                    ("speed_std_dev", std_dev, 6),
+                    ("coefficient_of_variation", coefficient_of_variation, 6),
+                    ("mean_speed_km_s", mean_speed, 4),
+                ),
                 recommended_action="Monitor for attitude-related issues. May affect tracking accuracy."
             )
         
@@ -267,20 +302,19 @@ class AnomalyDetector:
         """
         Perform comprehensive anomaly analysis on a satellite
         """
+        # Propagate the whole sampling grid in one SGP4 array call
+        return self.batch_analyze_vectorized(
+            [norad_id], [name], [satrec], [expected_altitude], hours_to_analyze
+        )
+    
+    def detect_all(self, norad_id: int, name: str, states: OrbitalStates,
+                   expected_altitude: float) -> List[AnomalyEvent]:
+        """
+        Run every detection algorithm over a satellite's orbital states
+        """
         anomalies = []
         
-        # Generate orbital states
-        now = datetime.utcnow()
-        states = []
-        
-        # Sample at 10-minute intervals
-        for i in range(int(hours_to_analyze * 6)):
-            dt = now - timedelta(hours=hours_to_analyze) + timedelta(minutes=i * 10)
-            state = self.propagate_state(satrec, dt)
-            if state:
-                states.append(state)
-        
-        if not states:
+        if not len(states):
             return anomalies
         
         # Run detection algorithms
@@ -302,41 +336,84 @@ class AnomalyDetector:
         
         return anomalies
     
-    def _velocity_magnitude(self, vx: float, vy: float, vz: float) -> float:
-        """Calculate velocity magnitude"""
-        return math.sqrt(vx**2 + vy**2 + vz**2)
-    
-    def batch_analyze(self, satellites: List[dict], sample_size: int = 100) -> Dict:
+    def batch_analyze_vectorized(self, norad_ids: List[int], names: List[str],
+                                 satrecs: List[Satrec], expected_altitudes: List[float],
+                                 hours_to_analyze: int = 24,
+                                 now: Optional[datetime] = None) -> List[AnomalyEvent]:
         """
-        Analyze multiple satellites for anomalies
-        Returns summary statistics and top anomalies
+        Analyze many satellites at once: propagate all of them over the sampling
+        grid in one SatrecArray call and evaluate the detectors with the array kernel.
+        analyze_satellite is the single-satellite case.
         """
-        all_anomalies = []
-        analyzed_count = 0
-        error_count = 0
+        if not satrecs:
+            return []
         
-        # Sample satellites for analysis
-        import random
-        sample = random.sample(satellites, min(sample_size, len(satellites)))
+        # Sample at 10-minute intervals
+        now = now or datetime.utcnow()
+        start = now - timedelta(hours=hours_to_analyze)
+        step = timedelta(minutes=10)
+        steps = int(hours_to_analyze * 6)
+        timestamps = np.datetime64(start, "us") + np.arange(steps) * np.timedelta64(step)
         
-        for sat in sample:
-            try:
-                satrec = Satrec.twoline2rv(sat['line1'], sat['line2'])
-                anomalies = self.analyze_satellite(
-                    sat['norad_id'],
-                    sat['name'],
-                    satrec,
-                    sat.get('altitude', 400)
-                )
-                all_anomalies.extend(anomalies)
-                analyzed_count += 1
-            except Exception as e:
-                error_count += 1
+        e, r, v = SatrecArray(satrecs).sgp4(*jday_grid(start, step, steps))
+        
+        # Magnitudes come from the float64 output (decay rates divide small altitude
+        # differences by short spans); the vectors are then only kept for event
+        # details, so they are stored as float32
+        valid = e == 0
+        altitude, speed, dv = anomaly_kernels.state_magnitudes(r, v)
+        r = r.astype(np.float32)
+        v = v.astype(np.float32)
+        
+        def states_of(row: int) -> OrbitalStates:
+            return OrbitalStates(timestamps, r[row], v[row], altitude[row], speed[row])
+        
+        time_diff_days = (timestamps[-1] - timestamps[0]) / np.timedelta64(1, "D")
+        flags = anomaly_kernels.detect(
+            dv, altitude, speed, np.asarray(expected_altitudes, dtype=float), time_diff_days,
+            self.MANEUVER_DETECTION_THRESHOLD, self.ALTITUDE_CHANGE_THRESHOLD_KM,
+        )
+        
+        flags_by_row = defaultdict(list)
+        for flag in flags.tolist():
+            flags_by_row[int(flag[anomaly_kernels.FLAG_ROW])].append(flag)
+        gapped = np.flatnonzero(~valid.all(axis=1)).tolist()
+        
+        anomalies = []
+        for row in sorted(flags_by_row.keys() | set(gapped)):
+            norad_id, name = norad_ids[row], names[row]
+            states = states_of(row)
+            if not valid[row].all():
+                # Gaps in propagation: fall back to the per-satellite detectors on valid epochs
+                states = states.select(valid[row])
+                anomalies.extend(self.detect_all(norad_id, name, states, expected_altitudes[row]))
                 continue
+            
+            for _, kind, t, value, aux in flags_by_row[row]:
+                t = int(t)
+                if kind == anomaly_kernels.FLAG_MANEUVER:
+                    event = self._maneuver_event(norad_id, name, value, states.state(t - 1), states.state(t))
+                elif kind == anomaly_kernels.FLAG_ALTITUDE:
+                    event = self._altitude_event(norad_id, name, states.state(t), expected_altitudes[row])
+                elif kind == anomaly_kernels.FLAG_DECAY:
+                    event = self._decay_event(norad_id, name, value, states.state(t))
+                else:
+                    event = self._tumbling_event(norad_id, name, value, aux, states.timestamps[t].item())
+                if event:
+                    anomalies.append(event)
+        
+        return anomalies
+    
+    def _analyze_sample(self, norad_ids: List[int], names: List[str], satrecs: List[Satrec],
+                        expected_altitudes: List[float], error_count: int) -> Dict:
+        """Analyze parsed satellites and summarize the anomalies for batch_analyze*"""
+        all_anomalies = self.batch_analyze_vectorized(norad_ids, names, satrecs, expected_altitudes)
         
-        # Sort by severity and confidence
+        # Top 20 by severity and confidence (same order as a stable full sort)
         severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
-        all_anomalies.sort(key=lambda x: (severity_order.get(x.severity, 4), -x.confidence))
+        top_anomalies = heapq.nsmallest(
+            20, all_anomalies, key=lambda x: (severity_order.get(x.severity, 4), -x.confidence)
+        )
         
         # Group by type
         by_type = defaultdict(int)
@@ -346,14 +423,73 @@ class AnomalyDetector:
             by_severity[a.severity] += 1
         
         return {
-            'total_analyzed': analyzed_count,
+            'total_analyzed': len(norad_ids),
             'errors': error_count,
             'anomalies_found': len(all_anomalies),
             'by_type': dict(by_type),
             'by_severity': dict(by_severity),
-            'top_anomalies': all_anomalies[:20]
+            'top_anomalies': top_anomalies
         }
+    
+    def batch_analyze(self, satellites: List[dict], sample_size: int = 100) -> Dict:
+        """
+        Analyze multiple satellites for anomalies
+        Returns summary statistics and top anomalies
+        """
+        error_count = 0
+        
+        # Sample satellites for analysis by index (NumPy shuffles the indices in C)
+        picks = _rng.choice(len(satellites), size=min(sample_size, len(satellites)), replace=False)
+        sample = [satellites[i] for i in picks.tolist()]
+        
+        parsed = []
+        satrecs = []
+        for sat in sample:
+            try:
+                # Reuse the record parsed at cache refresh when the TLE is unchanged
+                satrec = (
+                    cache.get_satrec_for_tle(sat['norad_id'], sat['line1'], sat['line2'])
+                    or Satrec.twoline2rv(sat['line1'], sat['line2'])
+                )
+                satrecs.append(satrec)
+                parsed.append(sat)
+            except Exception as e:
+                error_count += 1
+                continue
+        
+        return self._analyze_sample(
+            [sat['norad_id'] for sat in parsed],
+            [sat['name'] for sat in parsed],
+            satrecs,
+            [sat.get('altitude', DEFAULT_EXPECTED_ALTITUDE_KM) for sat in parsed],
+            error_count,
+        )
+    
+    def batch_analyze_catalog(self, snapshot: CacheSnapshot, rows: np.ndarray,
+                              sample_size: int = 100) -> Dict:
+        """
+        batch_analyze for cached satellites given by row of snapshot.columns.
+        SGP4 records and expected altitudes are read from the snapshot, so no
+        per-satellite dicts are built; satellites whose TLE failed to parse count as errors.
+        """
+        columns = snapshot.columns
+        
+        # Sample satellites for analysis
+        sample = _rng.choice(rows, size=min(sample_size, len(rows)), replace=False)
+        
+        satellites = columns.rows(sample)
+        satrecs = [snapshot.satrecs.get(sat.norad_id) for sat in satellites]
+        parsed = [i for i, satrec in enumerate(satrecs) if satrec is not None]
+        
+        return self._analyze_sample(
+            [satellites[i].norad_id for i in parsed],
+            [satellites[i].name for i in parsed],
+            [satrecs[i] for i in parsed],
+            columns.expected_altitudes[sample[parsed]].tolist(),
+            len(sample) - len(parsed),
+        )
 
 
 # Singleton instance
 anomaly_detector = AnomalyDetector()
+
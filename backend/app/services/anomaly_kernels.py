@@ -0,0 +1,120 @@
+"""
+Array kernels for the anomaly detector
+The numeric cores work on one satellite's (epochs, ...) arrays or on
+(satellites, epochs, ...) slabs; detect() evaluates every rule over a slab
+"""
+
+import numpy as np
+
+# Flag type codes, in the order the detectors run
+FLAG_MANEUVER = 0
+FLAG_ALTITUDE = 1
+FLAG_DECAY = 2
+FLAG_TUMBLING = 3
+
+EARTH_RADIUS_KM = 6371.0
+
+# Columns of the flags array
+FLAG_ROW = 0
+FLAG_TYPE = 1
+FLAG_EPOCH = 2
+FLAG_VALUE = 3
+FLAG_AUX = 4
+
+
+def velocity_changes(velocities: np.ndarray) -> np.ndarray:
+    """|dv| into each epoch 1..M-2 for (..., M, 3) velocities, shape (..., M-2)"""
+    dv_vecs = np.diff(velocities[..., :-1, :], axis=-2)
+    dv = np.einsum("...tk,...tk->...t", dv_vecs, dv_vecs)
+    return np.sqrt(dv, out=dv)
+
+
+def state_magnitudes(positions: np.ndarray, velocities: np.ndarray) -> tuple:
+    """
+    Altitude, speed and velocity_changes() for (..., M, 3) state vectors.
+    Each is one einsum reduction with the square root and offset applied in
+    place, so no (..., M, 3) temporaries are made beyond the velocity differences.
+    """
+    altitudes = np.einsum("...k,...k->...", positions, positions)
+    np.sqrt(altitudes, out=altitudes)
+    altitudes -= EARTH_RADIUS_KM
+    speeds = np.einsum("...k,...k->...", velocities, velocities)
+    np.sqrt(speeds, out=speeds)
+    return altitudes, speeds, velocity_changes(velocities)
+
+
+def first_exceedance(values: np.ndarray, threshold: float) -> np.ndarray:
+    """Index of the first value above threshold along the last axis, or -1"""
+    over = values > threshold
+    return np.where(over.any(axis=-1), over.argmax(axis=-1), -1)
+
+
+def decay_rates(altitudes: np.ndarray, span_days: float) -> np.ndarray:
+    """Altitude change rate in km/day between the first and last epoch"""
+    return (altitudes[..., -1] - altitudes[..., 0]) / span_days
+
+
+def speed_moments(speeds: np.ndarray) -> tuple:
+    """Population mean and variance of speed along the epoch axis"""
+    mean_speed = speeds.mean(axis=-1)
+    variance = ((speeds - mean_speed[..., None]) ** 2).mean(axis=-1)
+    return mean_speed, variance
+
+
+def detect(dv: np.ndarray, altitudes: np.ndarray, speeds: np.ndarray,
+           expected_altitudes: np.ndarray, span_days: float,
+           maneuver_threshold: float, altitude_threshold: float,
+           decay_bounds: tuple = (-10.0, 0.5), tumbling_cv: float = 0.001) -> np.ndarray:
+    """
+    Run every detection rule over N satellites sampled at M epochs.
+    
+    dv is (N, M-2) km/s from velocity_changes(), altitudes and speeds are
+    (N, M). Returns a (num_flags, 5) float array of (row, type, epoch, value,
+    aux) sorted by row and type, so only the flagged satellites need Python objects:
+    - maneuver: epoch of the first velocity jump, value = delta-v
+    - altitude: last epoch, value = latest altitude
+    - decay: last epoch, value = altitude change rate in km/day
+    - tumbling: last epoch, value = mean speed, aux = speed variance
+    """
+    n, m = altitudes.shape
+    flags = []
+    
+    def add(kind: int, rows: np.ndarray, epochs, values, aux=0.0):
+        block = np.empty((len(rows), 5))
+        block[:, FLAG_ROW] = rows
+        block[:, FLAG_TYPE] = kind
+        block[:, FLAG_EPOCH] = epochs
+        block[:, FLAG_VALUE] = values
+        block[:, FLAG_AUX] = aux
+        flags.append(block)
+    
+    # Maneuver: first velocity change into epochs 1..M-2 above the threshold
+    if m >= 3:
+        first = first_exceedance(dv, maneuver_threshold)
+        rows = np.flatnonzero(first >= 0)
+        add(FLAG_MANEUVER, rows, first[rows] + 1, dv[rows, first[rows]])
+    
+    if m >= 1:
+        # Altitude: latest altitude away from the expected one
+        latest = altitudes[:, -1]
+        rows = np.flatnonzero(np.abs(latest - expected_altitudes) > altitude_threshold)
+        add(FLAG_ALTITUDE, rows, m - 1, latest[rows])
+    
+    # Decay: altitude change rate between the first and last epoch
+    if m >= 2 and span_days >= 0.01:
+        decay_rate = decay_rates(altitudes, span_days)
+        rows = np.flatnonzero((decay_rate < decay_bounds[0]) | (decay_rate > decay_bounds[1]))
+        add(FLAG_DECAY, rows, m - 1, decay_rate[rows])
+    
+    # Tumbling: coefficient of variation of speed
+    if m >= 5:
+        mean_speed, variance = speed_moments(speeds)
+        cv = np.divide(np.sqrt(variance), mean_speed,
+                       out=np.zeros(n), where=mean_speed > 0)
+        rows = np.flatnonzero(cv > tumbling_cv)
+        add(FLAG_TUMBLING, rows, m - 1, mean_speed[rows], variance[rows])
+    
+    if not flags:
+        return np.empty((0, 5))
+    flags = np.concatenate(flags)
+    return flags[np.lexsort((flags[:, FLAG_TYPE], flags[:, FLAG_ROW]))]
@@ -0,0 +1,85 @@
+"""
+Background anomaly monitoring over a sample of the cached catalog
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.cache import cache
+from app.services.anomaly_detector import anomaly_detector
+
+logger = logging.getLogger(__name__)
+
+
+class AnomalyMonitor:
+    """Periodically runs batch anomaly analysis so requests can read the latest results"""
+    
+    def __init__(self):
+        self.results: Optional[Dict] = None  # Last batch_analyze output
+        self.analyzed_at: Optional[datetime] = None
+        self.source_update: Optional[datetime] = None  # cache.last_update the results were built from
+        self.sample_size = 50
+        self.interval = timedelta(minutes=10)  # Matches update_frequency_minutes in /anomaly/statistics
+        self.check_interval = 60  # Seconds between staleness checks
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()  # One analysis at a time for the loop and requests
+    
+    def is_stale(self, now: datetime) -> bool:
+        """Check whether the results must be recomputed"""
+        return (
+            self.results is None
+            or self.source_update != cache.last_update
+            or now - self.analyzed_at >= self.interval
+        )
+    
+    def analyze(self) -> Dict:
+        """Run batch analysis over the first sample_size cached satellites"""
+        snapshot = cache.snapshot
+        rows = np.arange(min(self.sample_size, len(snapshot.columns)))
+        return anomaly_detector.batch_analyze_catalog(snapshot, rows, self.sample_size)
+    
+    async def refresh(self):
+        """Recompute the results off the event loop if they are stale"""
+        async with self._refresh_lock:
+            now = datetime.utcnow()
+            if self.is_stale(now):
+                source_update = cache.last_update
+                self.results = await asyncio.to_thread(self.analyze)
+                self.analyzed_at = now
+                self.source_update = source_update
+                logger.info(f"Anomaly monitor: {self.results['anomalies_found']} anomalies found")
+    
+    async def get_results(self) -> Dict:
+        """Latest results, computing them first if none are current"""
+        await self.refresh()
+        return self.results
+    
+    async def _refresh_loop(self):
+        """Periodically recompute the results"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Anomaly monitor error: {e}")
+            await asyncio.sleep(self.check_interval)
+    
+    def start(self):
+        """Start the background refresh task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+    
+    def stop(self):
+        """Stop the background refresh task"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global anomaly monitor instance
+anomaly_monitor = AnomalyMonitor()
@@ -5,10 +5,75 @@ In-memory cache for satellite data
 from datetime import datetime
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
-import threading
+from collections import defaultdict
+from bisect import bisect_right
+import hashlib
 
+import numpy as np
+import orjson
+from sgp4.api import Satrec, SatrecArray
 
-@dataclass
+
+# Known satellite types; the position in this tuple is the type code used by the cache arrays
+SATELLITE_TYPES = ("satellite", "station", "debris", "rocket-body")
+
+# Expected altitude for anomaly analysis of satellites with no known altitude
+DEFAULT_EXPECTED_ALTITUDE_KM = 400.0
+
+# Satellites per broadcast SatrecArray; SGP4 holds the GIL for a whole call, so the
+# catalog is propagated chunk by chunk to let the event loop run in between
+SATREC_CHUNK_SIZE = 1024
+
+
+# Bulk-loading categories in priority order; the position is the category code
+TLE_CATEGORIES = (
+    "stations",       # Space stations (highest priority)
+    "special",        # Hubble, etc.
+    "gps",            # Navigation
+    "starlink",       # Starlink constellation
+    "oneweb",         # OneWeb constellation
+    "iridium",        # Iridium constellation
+    "other_active",   # Other active satellites
+    "debris",         # Debris
+    "rocket_bodies",  # Rocket bodies
+)
+
+
+def categorize_satellite(name: str, satellite_type: str) -> int:
+    """Bulk-loading category code for a satellite (index into TLE_CATEGORIES)"""
+    name_upper = name.upper()
+    
+    if satellite_type == "station" or "ISS" in name_upper or "TIANGONG" in name_upper or "CSS" in name_upper:
+        return 0
+    elif "HUBBLE" in name_upper or "HST" in name_upper:
+        return 1
+    elif "GPS" in name_upper or "NAVSTAR" in name_upper:
+        return 2
+    elif "STARLINK" in name_upper:
+        return 3
+    elif "ONEWEB" in name_upper:
+        return 4
+    elif "IRIDIUM" in name_upper:
+        return 5
+    elif satellite_type == "debris":
+        return 7
+    elif satellite_type == "rocket-body":
+        return 8
+    else:
+        return 6
+
+
+# Separators of the joined search text (lowercased names and ids never contain them)
+SEARCH_ENTRY_SEPARATOR = "\n"
+SEARCH_FIELD_SEPARATOR = "\x00"
+
+
+def trigrams(text: str) -> set:
+    """Set of 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass(slots=True)
 class SatelliteData:
     """Satellite data structure"""
     norad_id: int
@@ -22,23 +87,218 @@ class SatelliteData:
     period: Optional[float] = None
 
 
+def _optional_column(values: list) -> np.ndarray:
+    """float64 column with NaN where a value is unknown"""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
 @dataclass
-class CacheStore:
-    """Thread-safe cache store"""
+class SatelliteColumns:
+    """Columnar view of the catalog; row i of every array describes catalog[i]"""
+    catalog: List[SatelliteData] = field(default_factory=list)
+    norad_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    altitudes: np.ndarray = field(default_factory=lambda: np.empty(0))  # NaN where unknown
+    expected_altitudes: np.ndarray = field(default_factory=lambda: np.empty(0))  # Default where unknown or 0
+    inclinations: np.ndarray = field(default_factory=lambda: np.empty(0))
+    eccentricities: np.ndarray = field(default_factory=lambda: np.empty(0))
+    periods: np.ndarray = field(default_factory=lambda: np.empty(0))
+    type_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint8))
+    type_names: tuple = SATELLITE_TYPES
+    
+    # Altitude index: row order by altitude (unknown altitudes sort last) and the sorted values
+    alt_order: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp))
+    sorted_altitudes: np.ndarray = field(default_factory=lambda: np.empty(0))
+    
+    @classmethod
+    def from_catalog(cls, catalog: List[SatelliteData]) -> "SatelliteColumns":
+        """Build the columns for a list of satellites"""
+        type_names = list(SATELLITE_TYPES)
+        for sat in catalog:
+            if sat.satellite_type not in type_names:
+                type_names.append(sat.satellite_type)
+        type_index = {name: code for code, name in enumerate(type_names)}
+        
+        altitudes = _optional_column([sat.altitude for sat in catalog])
+        alt_order = np.argsort(altitudes, kind="stable")
+        
+        return cls(
+            catalog=catalog,
+            norad_ids=np.array([sat.norad_id for sat in catalog], dtype=np.int64),
+            altitudes=altitudes,
+            expected_altitudes=np.where(
+                np.isnan(altitudes) | (altitudes == 0), DEFAULT_EXPECTED_ALTITUDE_KM, altitudes
+            ),
+            inclinations=_optional_column([sat.inclination for sat in catalog]),
+            eccentricities=_optional_column([sat.eccentricity for sat in catalog]),
+            periods=_optional_column([sat.period for sat in catalog]),
+            type_codes=np.array([type_index[sat.satellite_type] for sat in catalog], dtype=np.uint8),
+            type_names=tuple(type_names),
+            alt_order=alt_order,
+            sorted_altitudes=altitudes[alt_order],
+        )
+    
+    def __len__(self) -> int:
+        return len(self.catalog)
+    
+    def type_code(self, sat_type: str) -> Optional[int]:
+        """Code of a satellite type, or None if no cached satellite has it"""
+        try:
+            return self.type_names.index(sat_type)
+        except ValueError:
+            return None
+    
+    def altitude_rows(self, min_altitude: float, max_altitude: float) -> np.ndarray:
+        """Rows with min_altitude < altitude < max_altitude, in catalog order"""
+        lo = np.searchsorted(self.sorted_altitudes, min_altitude, side="right")
+        hi = np.searchsorted(self.sorted_altitudes, max_altitude, side="left")
+        return np.sort(self.alt_order[lo:max(hi, lo)])
+    
+    def rows(self, positions: np.ndarray) -> List[SatelliteData]:
+        """Satellites at the given rows"""
+        catalog = self.catalog
+        return [catalog[position] for position in positions.tolist()]
+
+
+@dataclass(frozen=True)
+class CacheSnapshot:
+    """Everything derived from one TLE refresh; replaced as a whole, never mutated"""
     satellites: Dict[int, SatelliteData] = field(default_factory=dict)
+    satrecs: Dict[int, Satrec] = field(default_factory=dict)
     last_update: Optional[datetime] = None
-    _lock: threading.Lock = field(default_factory=threading.Lock)
+    
+    # Hash of the catalog contents; unlike last_update it is the same in every
+    # worker process holding the same TLEs, so it can serve as an HTTP validator
+    version: str = "0"
+    
+    # The satrecs in catalog order, in SATREC_CHUNK_SIZE arrays for bulk propagation;
+    # satrec_norad_ids holds the NORAD ID of each (satellites whose TLE failed to parse are absent)
+    satrec_arrays: List[SatrecArray] = field(default_factory=list)
+    satrec_norad_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint32))
+    
+    # Catalog columns for the analytics paths; the dict above serves lookups by ID
+    columns: SatelliteColumns = field(default_factory=SatelliteColumns)
+    
+    # Compact TLE records ({n, id, l1, l2, t}) for the bulk endpoints, in catalog order
+    tle_entries: List[dict] = field(default_factory=list)
+    tle_category_codes: List[int] = field(default_factory=list)  # TLE_CATEGORIES index per entry
+    
+    # Search index: ((lowercased name, id string) keys, trigram -> sorted positions,
+    # all keys joined into one text buffer, start offset of each entry in that buffer)
+    search_index: tuple = field(default_factory=lambda: ([], {}, "", []))
+
+
+class CacheStore:
+    """
+    Cache store with copy-on-write updates.
+    
+    update_satellites builds a new CacheSnapshot and swaps the reference in one
+    assignment, so readers need no lock: code that reads several fields should
+    take `snapshot` once and use it throughout.
+    """
+    
+    def __init__(self):
+        self.snapshot = CacheSnapshot()
+    
+    @property
+    def satellites(self) -> Dict[int, SatelliteData]:
+        return self.snapshot.satellites
+    
+    @property
+    def satrecs(self) -> Dict[int, Satrec]:
+        return self.snapshot.satrecs
+    
+    @property
+    def last_update(self) -> Optional[datetime]:
+        return self.snapshot.last_update
+    
+    @property
+    def columns(self) -> SatelliteColumns:
+        return self.snapshot.columns
     
     def update_satellites(self, satellites: List[SatelliteData]):
         """Update satellite cache"""
-        with self._lock:
-            self.satellites = {sat.norad_id: sat for sat in satellites}
-            self.last_update = datetime.utcnow()
+        by_id = {sat.norad_id: sat for sat in satellites}
+        
+        # Parse TLEs once per refresh rather than on every request
+        satrecs = {}
+        for sat in by_id.values():
+            try:
+                satrecs[sat.norad_id] = Satrec.twoline2rv(sat.line1, sat.line2)
+            except Exception:
+                continue
+        
+        catalog = list(by_id.values())
+        columns = SatelliteColumns.from_catalog(catalog)
+        satrec_rows = [row for row, sat in enumerate(catalog) if sat.norad_id in satrecs]
+        ordered_satrecs = [satrecs[catalog[row].norad_id] for row in satrec_rows]
+        
+        tle_entries = [
+            {
+                "n": sat.name,
+                "id": sat.norad_id,
+                "l1": sat.line1,
+                "l2": sat.line2,
+                "t": sat.satellite_type,
+            }
+            for sat in catalog
+        ]
+        tle_category_codes = [categorize_satellite(sat.name, sat.satellite_type) for sat in catalog]
+        version = hashlib.blake2b(orjson.dumps(tle_entries), digest_size=8).hexdigest()
+        
+        # Trigram posting lists over names and NORAD IDs for substring search
+        search_keys = [(sat.name.lower(), str(sat.norad_id)) for sat in catalog]
+        postings = defaultdict(list)
+        for position, (name, norad_id) in enumerate(search_keys):
+            for gram in trigrams(name) | trigrams(norad_id):
+                postings[gram].append(position)
+        
+        # Entries are "name\x00id" joined by newlines, so a match never spans two entries
+        search_text = SEARCH_ENTRY_SEPARATOR.join(
+            name + SEARCH_FIELD_SEPARATOR + norad_id for name, norad_id in search_keys
+        )
+        entry_starts = []
+        offset = 0
+        for name, norad_id in search_keys:
+            entry_starts.append(offset)
+            offset += len(name) + len(norad_id) + 2
+        
+        self.snapshot = CacheSnapshot(
+            satellites=by_id,
+            satrecs=satrecs,
+            last_update=datetime.utcnow(),
+            version=version,
+            satrec_arrays=[
+                SatrecArray(ordered_satrecs[first:first + SATREC_CHUNK_SIZE])
+                for first in range(0, len(ordered_satrecs), SATREC_CHUNK_SIZE)
+            ],
+            satrec_norad_ids=columns.norad_ids[satrec_rows].astype(np.uint32),
+            columns=columns,
+            tle_entries=tle_entries,
+            tle_category_codes=tle_category_codes,
+            search_index=(search_keys, dict(postings), search_text, entry_starts),
+        )
     
     def get_satellite(self, norad_id: int) -> Optional[SatelliteData]:
         """Get satellite by NORAD ID"""
         return self.satellites.get(norad_id)
     
+    def get_satrec(self, norad_id: int) -> Optional[Satrec]:
+        """Get the parsed SGP4 record for a satellite (None if its TLE failed to parse)"""
+        return self.satrecs.get(norad_id)
+    
+    def get_satrec_for_tle(self, norad_id: int, line1: str, line2: str) -> Optional[Satrec]:
+        """Get the cached SGP4 record for a TLE, only if the cache holds exactly that TLE"""
+        snapshot = self.snapshot
+        sat = snapshot.satellites.get(norad_id)
+        if sat is None or sat.line1 != line1 or sat.line2 != line2:
+            return None
+        return snapshot.satrecs.get(norad_id)
+    
+    def get_satellite_ids_in_altitude_band(self, min_altitude: float, max_altitude: float) -> np.ndarray:
+        """Get NORAD IDs with min_altitude < altitude < max_altitude, in catalog order"""
+        columns = self.columns
+        return columns.norad_ids[columns.altitude_rows(min_altitude, max_altitude)]
+    
     def get_all_satellites(self) -> List[SatelliteData]:
         """Get all satellites"""
         return list(self.satellites.values())
@@ -47,11 +307,34 @@ class CacheStore:
         """Search satellites by name or NORAD ID"""
         query = query.lower()
         results = []
+        snapshot = self.snapshot
+        catalog = snapshot.columns.catalog
+        search_keys, postings, search_text, entry_starts = snapshot.search_index
         
-        for sat in self.satellites.values():
-            if (query in sat.name.lower() or 
-                query in str(sat.norad_id)):
-                results.append(sat)
+        grams = trigrams(query)
+        if not grams and SEARCH_ENTRY_SEPARATOR not in query and SEARCH_FIELD_SEPARATOR not in query:
+            # Short queries: find successive matches in the joined text buffer,
+            # skipping to the next entry after each hit
+            found = search_text.find(query)
+            while found != -1:
+                position = bisect_right(entry_starts, found) - 1
+                results.append(catalog[position])
+                if len(results) >= limit or position + 1 >= len(entry_starts):
+                    break
+                found = search_text.find(query, entry_starts[position + 1])
+            return results
+        
+        # Every match contains each of the query's trigrams, so only the shortest
+        # (already sorted) posting list needs checking
+        if grams:
+            candidates = min((postings.get(gram, ()) for gram in grams), key=len)
+        else:
+            candidates = range(len(catalog))
+        
+        for position in candidates:
+            name, norad_id = search_keys[position]
+            if query in name or query in norad_id:
+                results.append(catalog[position])
                 if len(results) >= limit:
                     break
         
@@ -64,26 +347,29 @@ class CacheStore:
         max_altitude: Optional[float] = None,
         limit: int = 1000
     ) -> List[SatelliteData]:
-        """Filter satellites by criteria"""
-        results = []
+        """Filter satellites by criteria, in catalog order"""
+        columns = self.columns
+        sorted_altitudes = columns.sorted_altitudes
         
-        for sat in self.satellites.values():
-            # Type filter
-            if sat_type and sat_type != "all" and sat.satellite_type != sat_type:
-                continue
-            
-            # Altitude filter
-            if sat.altitude is not None:
-                if min_altitude is not None and sat.altitude < min_altitude:
-                    continue
-                if max_altitude is not None and sat.altitude > max_altitude:
-                    continue
-            
-            results.append(sat)
-            if len(results) >= limit:
-                break
+        # Altitude filter: binary search the altitude index for the range, then keep
+        # unknown altitudes (NaN, sorted last) which pass any bounds
+        if min_altitude is None and max_altitude is None:
+            positions = np.arange(len(columns))
+        else:
+            known = np.searchsorted(sorted_altitudes, np.inf, side="right")
+            lo = 0 if min_altitude is None else np.searchsorted(sorted_altitudes[:known], min_altitude, side="left")
+            hi = known if max_altitude is None else np.searchsorted(sorted_altitudes[:known], max_altitude, side="right")
+            alt_order = columns.alt_order
+            positions = np.sort(np.concatenate([alt_order[lo:max(hi, lo)], alt_order[known:]]))
         
-        return results
+        # Type filter on the remaining candidates
+        if sat_type and sat_type != "all":
+            code = columns.type_code(sat_type)
+            if code is None:
+                return []
+            positions = positions[columns.type_codes[positions] == code]
+        
+        return columns.rows(positions[:limit])
 
 
 # Global cache instance
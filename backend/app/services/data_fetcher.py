@@ -6,16 +6,52 @@ import httpx
 import logging
 import ssl
 import certifi
-from typing import List, Tuple, Optional
+from functools import lru_cache
+from typing import Collection, Dict, List, Tuple, Optional
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
 import math
+import os
+import random
+import re
+import tempfile
+import time
 import asyncio
 
+import numpy as np
+
 from app.services.cache import cache, SatelliteData
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Characters per TLE line; fields sit at fixed columns
+TLE_LINE_WIDTH = 69
+
+# Field columns, built once and shared by the scalar and vectorized parsers
+NORAD_ID_COLUMNS = slice(2, 7)  # Line 1
+INTL_DESIGNATOR_COLUMNS = slice(9, 17)  # Line 1
+INCLINATION_COLUMNS = slice(8, 16)  # Line 2
+ECCENTRICITY_COLUMNS = slice(26, 33)  # Line 2, implied leading decimal point
+MEAN_MOTION_COLUMNS = slice(52, 63)  # Line 2, revolutions per day
+
+EARTH_RADIUS_KM = 6371.0
+
+# Kepler's third law folded into one constant: semi-major axis (km) = SMA_K * period_minutes ** (2/3)
+SMA_K = (398600.4418 * 3600.0 / (4.0 * math.pi * math.pi)) ** (1.0 / 3.0)
+
+# Name keywords per satellite type, in priority order; each is one compiled
+# alternation so a name is scanned once per type instead of once per keyword
+SATELLITE_TYPE_PATTERNS = [
+    ("station", re.compile("ISS|TIANGONG|TIANHE|STATION|CSS")),
+    ("debris", re.compile("DEB|FRAG")),
+    ("rocket-body", re.compile("R/B|ROCKET|CENTAUR|BLOCK")),
+]
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
 # Primary TLE data sources - CelesTrak GP API
 TLE_SOURCES_PRIMARY = [
     {"name": "Space Stations", "url": "https://celestrak.org/NORAD/elements/gp.php?GROUP=stations&FORMAT=tle"},
@@ -42,40 +78,44 @@ TLE_SOURCES_MIRROR = [
 ]
 
 
-def parse_tle_line(line1: str, line2: str) -> dict:
-    """Parse TLE lines to extract orbital elements"""
+def parse_tle_line(line1: str, line2: str, need_altitude: bool = True) -> dict:
+    """
+    Parse TLE lines to extract orbital elements.
+    With need_altitude=False the altitude is not computed and its key is omitted.
+    """
+    if len(line1) < TLE_LINE_WIDTH or len(line2) < TLE_LINE_WIDTH:
+        logger.warning("Failed to parse TLE: lines must be %d characters", TLE_LINE_WIDTH)
+        return {}
+    
     try:
+        # Fields are fixed-width; int() and float() skip their padding
         # Extract from line 1
-        norad_id = int(line1[2:7].strip())
-        intl_designator = line1[9:17].strip()
+        norad_id = int(line1[NORAD_ID_COLUMNS])
+        intl_designator = line1[INTL_DESIGNATOR_COLUMNS].rstrip()
         
         # Extract from line 2
-        inclination = float(line2[8:16].strip())
-        eccentricity = float("0." + line2[26:33].strip())
-        mean_motion = float(line2[52:63].strip())
+        inclination = float(line2[INCLINATION_COLUMNS])
+        eccentricity = float("0." + line2[ECCENTRICITY_COLUMNS])
+        mean_motion = float(line2[MEAN_MOTION_COLUMNS])
         
         # Calculate orbital period (minutes)
         period = 1440.0 / mean_motion if mean_motion > 0 else 0
         
-        # Approximate altitude (km) from mean motion
-        GM = 398600.4418
-        T_seconds = period * 60
-        if T_seconds > 0:
-            semi_major_axis = (GM * (T_seconds ** 2) / (4 * math.pi ** 2)) ** (1/3)
-            altitude = semi_major_axis - 6371  # Earth radius
-        else:
-            altitude = 0
-        
-        return {
+        parsed = {
             "norad_id": norad_id,
             "intl_designator": intl_designator,
             "inclination": inclination,
             "eccentricity": eccentricity,
             "period": period,
-            "altitude": altitude,
         }
+        
+        if need_altitude:
+            # Approximate altitude (km) from mean motion
+            parsed["altitude"] = SMA_K * period ** (2.0 / 3.0) - EARTH_RADIUS_KM if period > 0 else 0
+        
+        return parsed
     except Exception as e:
-        logger.warning(f"Failed to parse TLE: {e}")
+        logger.warning("Failed to parse TLE: %s", e)
         return {}
 
 
@@ -83,50 +123,312 @@ def determine_satellite_type(name: str) -> str:
     """Determine satellite type from name"""
     upper_name = name.upper()
     
-    if any(x in upper_name for x in ["ISS", "TIANGONG", "TIANHE", "STATION", "CSS"]):
-        return "station"
-    if any(x in upper_name for x in ["DEB", "DEBRIS", "FRAG"]):
-        return "debris"
-    if any(x in upper_name for x in ["R/B", "ROCKET", "CENTAUR", "BLOCK"]):
-        return "rocket-body"
+    for satellite_type, pattern in SATELLITE_TYPE_PATTERNS:
+        if pattern.search(upper_name):
+            return satellite_type
     
     return "satellite"
 
 
-def parse_tle_text(text: str) -> List[SatelliteData]:
-    """Parse TLE text file format"""
-    satellites = []
-    lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
+def parse_tle_columns(lines1: List[str], lines2: List[str]) -> dict:
+    """
+    parse_tle_line for many TLEs at once: each field is one NumPy conversion
+    over a fixed-width byte column. Raises ValueError if any TLE is malformed.
+    """
+    l1 = np.array(lines1, dtype=f"S{TLE_LINE_WIDTH}").view(np.uint8).reshape(-1, TLE_LINE_WIDTH)
+    l2 = np.array(lines2, dtype=f"S{TLE_LINE_WIDTH}").view(np.uint8).reshape(-1, TLE_LINE_WIDTH)
+    
+    # Shorter lines are NUL-padded to the width
+    if not (l1[:, -1].all() and l2[:, -1].all()):
+        raise ValueError(f"TLE lines must be {TLE_LINE_WIDTH} characters")
+    
+    def field(lines: np.ndarray, columns: slice) -> np.ndarray:
+        width = columns.stop - columns.start
+        return np.ascontiguousarray(lines[:, columns]).view(f"S{width}").ravel()
+    
+    # Eccentricity has an implied leading decimal point
+    digits = l2[:, ECCENTRICITY_COLUMNS]
+    eccentricity_text = np.empty((len(l2), 2 + digits.shape[1]), dtype=np.uint8)
+    eccentricity_text[:, :2] = np.frombuffer(b"0.", dtype=np.uint8)
+    eccentricity_text[:, 2:] = digits
+    
+    mean_motion = field(l2, MEAN_MOTION_COLUMNS).astype(np.float64)
+    period = np.divide(1440.0, mean_motion, out=np.zeros(len(mean_motion)), where=mean_motion > 0)
+    
+    # Approximate altitude (km) from mean motion
+    altitude = SMA_K * np.cbrt(period * period) - EARTH_RADIUS_KM
+    
+    return {
+        "norad_id": field(l1, NORAD_ID_COLUMNS).astype(np.int64),
+        "inclination": field(l2, INCLINATION_COLUMNS).astype(np.float64),
+        "eccentricity": eccentricity_text.view(f"S{eccentricity_text.shape[1]}").ravel().astype(np.float64),
+        "mean_motion": mean_motion,
+        "period": period,
+        "altitude": altitude,
+    }
+
+
+class TLEReader:
+    """Collects name/line1/line2 triplets from TLE text fed one line at a time"""
     
-    i = 0
-    while i < len(lines) - 2:
-        name = lines[i]
-        line1 = lines[i + 1]
-        line2 = lines[i + 2]
+    def __init__(self):
+        self.window: List[str] = []  # Up to three candidate lines
+        self.partial = ""  # Unterminated last line of the chunks fed so far
+        self.names: List[str] = []
+        self.lines1: List[str] = []
+        self.lines2: List[str] = []
+    
+    def feed(self, line: str):
+        """Add the next line of text"""
+        line = line.strip()
+        if not line:
+            return
         
-        # Validate TLE format
-        if line1.startswith('1 ') and line2.startswith('2 '):
-            parsed = parse_tle_line(line1, line2)
-            
-            if parsed:
-                sat = SatelliteData(
-                    norad_id=parsed["norad_id"],
-                    name=name,
-                    line1=line1,
-                    line2=line2,
-                    satellite_type=determine_satellite_type(name),
-                    altitude=parsed.get("altitude"),
-                    inclination=parsed.get("inclination"),
-                    eccentricity=parsed.get("eccentricity"),
-                    period=parsed.get("period"),
-                )
-                satellites.append(sat)
-            
-            i += 3
+        window = self.window
+        window.append(line)
+        if len(window) < 3:
+            return
+        
+        # Validate TLE format (a slice compare is cheaper than startswith)
+        name, line1, line2 = window
+        if line1[:2] == '1 ' and line2[:2] == '2 ':
+            self.names.append(name)
+            self.lines1.append(line1)
+            self.lines2.append(line2)
+            window.clear()
         else:
-            i += 1
+            del window[0]
+    
+    def feed_lines(self, lines: List[str]):
+        """
+        Add several lines. While the window is empty, aligned triplets are taken
+        three at a time straight from one iterator; anything else goes through feed()
+        """
+        window = self.window
+        it = iter([line for line in map(str.strip, lines) if line])
+        for name in it:
+            if window:
+                self.feed(name)
+                continue
+            
+            line1 = next(it, None)
+            line2 = next(it, None)
+            if line2 is not None and line1[:2] == '1 ' and line2[:2] == '2 ':
+                self.names.append(name)
+                self.lines1.append(line1)
+                self.lines2.append(line2)
+            else:
+                # Misaligned (or the last lines): slide through them one at a time
+                for line in (name, line1, line2):
+                    if line is not None:
+                        self.feed(line)
+    
+    def feed_bytes(self, chunk: bytes):
+        """
+        Add the next chunk of a byte stream. TLEs are ASCII, so chunks are decoded
+        without charset detection; other bytes become U+FFFD one by one, so a
+        chunk boundary never splits a character.
+        """
+        lines = (self.partial + chunk.decode("ascii", "replace")).split("\n")
+        self.partial = lines.pop()
+        self.feed_lines(lines)
+    
+    def close(self):
+        """Feed the last line if the stream did not end with a newline"""
+        if self.partial:
+            self.feed(self.partial)
+            self.partial = ""
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def satellites(self, seen: Optional[Collection[int]] = None) -> List[SatelliteData]:
+        """Parse the triplets collected so far (see parse_tle_triplets for seen)"""
+        return parse_tle_triplets(self.names, self.lines1, self.lines2, seen)
+
+
+def parse_tle_text(text: str) -> List[SatelliteData]:
+    """Parse TLE text file format"""
+    reader = TLEReader()
+    reader.feed_lines(text.split('\n'))
+    return reader.satellites()
+
+
+def parse_tle_triplets(names: List[str], lines1: List[str], lines2: List[str],
+                       seen: Optional[Collection[int]] = None) -> List[SatelliteData]:
+    """
+    Parse aligned TLE name/line1/line2 lists.
+    With seen, NORAD IDs in it and repeats of an earlier TLE are skipped
+    before any SatelliteData is built.
+    """
+    try:
+        columns = parse_tle_columns(lines1, lines2)
+    except ValueError:
+        # Some TLE is malformed: parse them one at a time so only the bad ones are skipped
+        satellites = []
+        parsed_ids = set()
+        for name, line1, line2 in zip(names, lines1, lines2):
+            parsed = parse_tle_line(line1, line2)
+            if not parsed:
+                continue
+            if seen is not None:
+                if parsed["norad_id"] in seen or parsed["norad_id"] in parsed_ids:
+                    continue
+                parsed_ids.add(parsed["norad_id"])
+            satellites.append(satellite_from_tle(name, line1, line2, parsed))
+        return satellites
+    
+    if seen is not None:
+        # First TLE of each NORAD ID that is not already seen
+        norad_ids = columns["norad_id"]
+        keep = np.sort(np.unique(norad_ids, return_index=True)[1])
+        seen_ids = np.fromiter(seen, dtype=np.int64, count=len(seen))
+        keep = keep[~np.isin(norad_ids[keep], seen_ids)]
+        columns = {field: values[keep] for field, values in columns.items()}
+        keep = keep.tolist()
+        names = [names[row] for row in keep]
+        lines1 = [lines1[row] for row in keep]
+        lines2 = [lines2[row] for row in keep]
+    
+    # Unknown orbits report 0 like parse_tle_line; only those rows are patched
+    periods = columns["period"].tolist()
+    for row in np.flatnonzero(~(columns["mean_motion"] > 0)).tolist():
+        periods[row] = 0
+    altitudes = columns["altitude"].tolist()
+    for row in np.flatnonzero(~(columns["period"] > 0)).tolist():
+        altitudes[row] = 0
     
-    return satellites
+    # Build the records column-wise, in SatelliteData field order
+    return list(map(
+        SatelliteData,
+        columns["norad_id"].tolist(),
+        names,
+        lines1,
+        lines2,
+        map(determine_satellite_type, names),
+        altitudes,
+        columns["inclination"].tolist(),
+        columns["eccentricity"].tolist(),
+        periods,
+    ))
+
+
+def satellite_from_tle(name: str, line1: str, line2: str, parsed: dict) -> SatelliteData:
+    """Build a SatelliteData from TLE lines and their parse_tle_line fields"""
+    return SatelliteData(
+        norad_id=parsed["norad_id"],
+        name=name,
+        line1=line1,
+        line2=line2,
+        satellite_type=determine_satellite_type(name),
+        altitude=parsed.get("altitude"),
+        inclination=parsed.get("inclination"),
+        eccentricity=parsed.get("eccentricity"),
+        period=parsed.get("period"),
+    )
+
+
+# Sample TLEs served when every remote source fails
+FALLBACK_TLES = [
+    # === Space Stations ===
+    ("ISS (ZARYA)", "1 25544U 98067A   24001.50000000  .00016717  00000-0  10270-3 0  9025", "2 25544  51.6400 208.9163 0006703 167.7423 192.4284 15.50000000    12"),
+    ("CSS (TIANHE)", "1 48274U 21035A   24001.50000000  .00020000  00000-0  22000-3 0  9999", "2 48274  41.4700  50.0000 0005000 280.0000  80.0000 15.60000000    17"),
+    
+    # === Special Missions ===
+    ("HST", "1 20580U 90037B   24001.50000000  .00000880  00000-0  00000+0 0  9999", "2 20580  28.4700  85.0000 0002700 100.0000 260.0000 15.09000000    17"),
+    
+    # === GPS Constellation (31 operational) ===
+    ("GPS BIIR-2  (PRN 13)", "1 24876U 97035A   24001.50000000 -.00000020  00000-0  00000+0 0  9999", "2 24876  55.4000 150.0000 0100000  90.0000 270.0000  2.00550000    17"),
+    ("GPS BIIR-3  (PRN 11)", "1 25933U 99055A   24001.50000000  .00000010  00000-0  00000+0 0  9999", "2 25933  51.9000 210.0000 0150000 120.0000 240.0000  2.00560000    17"),
+    ("GPS BIIR-4  (PRN 20)", "1 26360U 00025A   24001.50000000 -.00000010  00000-0  00000+0 0  9999", "2 26360  53.0000  30.0000 0050000 200.0000 160.0000  2.00570000    17"),
+    ("GPS BIIR-5  (PRN 28)", "1 26407U 00040A   24001.50000000  .00000005  00000-0  00000+0 0  9999", "2 26407  56.7000  90.0000 0080000  45.0000 315.0000  2.00580000    17"),
+    ("GPS BIIF-1  (PRN 25)", "1 36585U 10022A   24001.50000000 -.00000005  00000-0  00000+0 0  9999", "2 36585  55.0000 270.0000 0120000 135.0000 225.0000  2.00590000    17"),
+    ("GPS BIIF-2  (PRN 01)", "1 37753U 11036A   24001.50000000  .00000008  00000-0  00000+0 0  9999", "2 37753  55.2000  60.0000 0090000 180.0000 180.0000  2.00545000    17"),
+    ("GPS BIIF-3  (PRN 24)", "1 38833U 12053A   24001.50000000 -.00000003  00000-0  00000+0 0  9999", "2 38833  54.8000 330.0000 0110000  75.0000 285.0000  2.00555000    17"),
+    ("GPS III-1  (PRN 04)", "1 43873U 18109A   24001.50000000  .00000012  00000-0  00000+0 0  9999", "2 43873  55.1000 120.0000 0070000 250.0000 110.0000  2.00565000    17"),
+    ("GPS III-2  (PRN 18)", "1 44506U 19056A   24001.50000000 -.00000007  00000-0  00000+0 0  9999", "2 44506  55.0000 180.0000 0080000 300.0000  60.0000  2.00575000    17"),
+    ("GPS III-3  (PRN 23)", "1 45854U 20041A   24001.50000000  .00000006  00000-0  00000+0 0  9999", "2 45854  55.3000 240.0000 0065000  15.0000 345.0000  2.00585000    17"),
+    
+    # === GLONASS Constellation ===
+    ("COSMOS 2459 (GLONASS)", "1 37867U 11064A   24001.50000000 -.00000010  00000-0  00000+0 0  9999", "2 37867  64.8000 100.0000 0010000 120.0000 240.0000  2.13000000    17"),
+    ("COSMOS 2460 (GLONASS)", "1 37868U 11064B   24001.50000000  .00000005  00000-0  00000+0 0  9999", "2 37868  64.8000 101.0000 0012000 115.0000 245.0000  2.13000000    17"),
+    ("COSMOS 2461 (GLONASS)", "1 37869U 11064C   24001.50000000 -.00000008  00000-0  00000+0 0  9999", "2 37869  64.8000 102.0000 0008000 110.0000 250.0000  2.13000000    17"),
+    ("COSMOS 2514 (GLONASS)", "1 43508U 18053A   24001.50000000  .00000003  00000-0  00000+0 0  9999", "2 43508  64.9000 160.0000 0015000 200.0000 160.0000  2.13100000    17"),
+    ("COSMOS 2545 (GLONASS)", "1 45358U 20018A   24001.50000000 -.00000006  00000-0  00000+0 0  9999", "2 45358  64.7000 220.0000 0009000 280.0000  80.0000  2.13050000    17"),
+    
+    # === Galileo Constellation ===
+    ("GALILEO 201 (E18)", "1 40544U 15017A   24001.50000000  .00000002  00000-0  00000+0 0  9999", "2 40544  56.0000  45.0000 0003000 200.0000 160.0000  1.70000000    17"),
+    ("GALILEO 202 (E14)", "1 40545U 15017B   24001.50000000  .00000001  00000-0  00000+0 0  9999", "2 40545  56.0000  46.0000 0004000 195.0000 165.0000  1.70000000    17"),
+    ("GALILEO 203 (E26)", "1 40889U 15045A   24001.50000000 -.00000002  00000-0  00000+0 0  9999", "2 40889  55.8000 105.0000 0005000 250.0000 110.0000  1.70050000    17"),
+    ("GALILEO 204 (E22)", "1 40890U 15045B   24001.50000000  .00000003  00000-0  00000+0 0  9999", "2 40890  55.9000 106.0000 0003500 240.0000 120.0000  1.70025000    17"),
+    
+    # === Iridium NEXT Constellation ===
+    ("IRIDIUM 100", "1 41917U 17003A   24001.50000000  .00000080  00000-0  20000-4 0  9999", "2 41917  86.4000  60.0000 0002000  90.0000 270.0000 14.34000000    17"),
+    ("IRIDIUM 102", "1 41918U 17003B   24001.50000000  .00000075  00000-0  18000-4 0  9999", "2 41918  86.4000  61.0000 0002200  85.0000 275.0000 14.34000000    17"),
+    ("IRIDIUM 103", "1 41919U 17003C   24001.50000000  .00000085  00000-0  22000-4 0  9999", "2 41919  86.4000  62.0000 0001800  80.0000 280.0000 14.34000000    17"),
+    ("IRIDIUM 104", "1 41920U 17003D   24001.50000000  .00000070  00000-0  16000-4 0  9999", "2 41920  86.4000  63.0000 0002400  75.0000 285.0000 14.34000000    17"),
+    ("IRIDIUM 105", "1 41921U 17003E   24001.50000000  .00000090  00000-0  24000-4 0  9999", "2 41921  86.4000  64.0000 0001600  70.0000 290.0000 14.34000000    17"),
+    ("IRIDIUM 106", "1 41922U 17003F   24001.50000000  .00000078  00000-0  19000-4 0  9999", "2 41922  86.4000  65.0000 0001900  65.0000 295.0000 14.34000000    17"),
+    ("IRIDIUM 107", "1 41923U 17003G   24001.50000000  .00000082  00000-0  21000-4 0  9999", "2 41923  86.4000  66.0000 0002100  60.0000 300.0000 14.34000000    17"),
+    ("IRIDIUM 108", "1 41924U 17003H   24001.50000000  .00000072  00000-0  17000-4 0  9999", "2 41924  86.4000  67.0000 0001700  55.0000 305.0000 14.34000000    17"),
+    
+    # === Starlink Samples (representative set across shells) ===
+    ("STARLINK-1007", "1 44713U 19074A   24001.50000000  .00020000  00000-0  10000-3 0  9999", "2 44713  53.0000 120.0000 0001500  90.0000 270.0000 15.06000000    17"),
+    ("STARLINK-1008", "1 44714U 19074B   24001.50000000  .00018000  00000-0  95000-4 0  9999", "2 44714  53.0000 121.0000 0001200  85.0000 275.0000 15.06000000    17"),
+    ("STARLINK-1009", "1 44715U 19074C   24001.50000000  .00019000  00000-0  98000-4 0  9999", "2 44715  53.0000 122.0000 0001800  80.0000 280.0000 15.06000000    17"),
+    ("STARLINK-1010", "1 44716U 19074D   24001.50000000  .00017000  00000-0  92000-4 0  9999", "2 44716  53.0000 123.0000 0001100  75.0000 285.0000 15.06000000    17"),
+    ("STARLINK-1011", "1 44717U 19074E   24001.50000000  .00016000  00000-0  88000-4 0  9999", "2 44717  53.0000 124.0000 0001400  70.0000 290.0000 15.06000000    17"),
+    ("STARLINK-1012", "1 44718U 19074F   24001.50000000  .00021000  00000-0  11000-3 0  9999", "2 44718  53.0000 125.0000 0001600  65.0000 295.0000 15.06000000    17"),
+    ("STARLINK-1013", "1 44719U 19074G   24001.50000000  .00015000  00000-0  85000-4 0  9999", "2 44719  53.0000 126.0000 0001300  60.0000 300.0000 15.06000000    17"),
+    ("STARLINK-1014", "1 44720U 19074H   24001.50000000  .00022000  00000-0  12000-3 0  9999", "2 44720  53.0000 127.0000 0001000  55.0000 305.0000 15.06000000    17"),
+    ("STARLINK-1015", "1 44721U 19074J   24001.50000000  .00014000  00000-0  80000-4 0  9999", "2 44721  53.0000 128.0000 0001700  50.0000 310.0000 15.06000000    17"),
+    ("STARLINK-1016", "1 44722U 19074K   24001.50000000  .00023000  00000-0  13000-3 0  9999", "2 44722  53.0000 129.0000 0001900  45.0000 315.0000 15.06000000    17"),
+    ("STARLINK-2000", "1 47183U 20088A   24001.50000000  .00019500  00000-0  99000-4 0  9999", "2 47183  53.0000 200.0000 0001300 100.0000 260.0000 15.06000000    17"),
+    ("STARLINK-2001", "1 47184U 20088B   24001.50000000  .00018500  00000-0  94000-4 0  9999", "2 47184  53.0000 201.0000 0001500  95.0000 265.0000 15.06000000    17"),
+    ("STARLINK-3000", "1 50000U 21001A   24001.50000000  .00020500  00000-0  10500-3 0  9999", "2 50000  53.2000  50.0000 0001200 150.0000 210.0000 15.06000000    17"),
+    ("STARLINK-3001", "1 50001U 21001B   24001.50000000  .00019800  00000-0  10100-3 0  9999", "2 50001  53.2000  51.0000 0001400 145.0000 215.0000 15.06000000    17"),
+    
+    # === OneWeb Samples ===
+    ("ONEWEB-0012", "1 44057U 19010A   24001.50000000  .00000100  00000-0  10000-4 0  9999", "2 44057  87.9000 180.0000 0001500  45.0000 315.0000 13.15000000    17"),
+    ("ONEWEB-0013", "1 44058U 19010B   24001.50000000  .00000095  00000-0  95000-5 0  9999", "2 44058  87.9000 181.0000 0001700  40.0000 320.0000 13.15000000    17"),
+    ("ONEWEB-0014", "1 44059U 19010C   24001.50000000  .00000105  00000-0  11000-4 0  9999", "2 44059  87.9000 182.0000 0001300  35.0000 325.0000 13.15000000    17"),
+    ("ONEWEB-0015", "1 44060U 19010D   24001.50000000  .00000088  00000-0  88000-5 0  9999", "2 44060  87.9000 183.0000 0001900  30.0000 330.0000 13.15000000    17"),
+    ("ONEWEB-0100", "1 45132U 20008A   24001.50000000  .00000092  00000-0  92000-5 0  9999", "2 45132  87.9000 250.0000 0001400  70.0000 290.0000 13.15000000    17"),
+    ("ONEWEB-0101", "1 45133U 20008B   24001.50000000  .00000098  00000-0  98000-5 0  9999", "2 45133  87.9000 251.0000 0001600  65.0000 295.0000 13.15000000    17"),
+    
+    # === Debris Samples ===
+    ("COSMOS 2251 DEB", "1 34454U 93036PX  24001.50000000  .00002000  00000-0  10000-3 0  9999", "2 34454  74.0000 200.0000 0100000  60.0000 300.0000 14.50000000    17"),
+    ("FENGYUN 1C DEB", "1 31141U 99025ANF 24001.50000000  .00001500  00000-0  80000-4 0  9999", "2 31141  99.0000 150.0000 0080000 100.0000 260.0000 14.20000000    17"),
+    ("COSMOS 1408 DEB", "1 49127U 21109A   24001.50000000  .00003500  00000-0  18000-3 0  9999", "2 49127  82.5000  75.0000 0120000 130.0000 230.0000 14.90000000    17"),
+    ("IRIDIUM 33 DEB", "1 33776U 09005A   24001.50000000  .00001800  00000-0  90000-4 0  9999", "2 33776  86.4000 300.0000 0050000  20.0000 340.0000 14.60000000    17"),
+    
+    # === Rocket Bodies ===
+    ("CZ-2C R/B", "1 25732U 99025B   24001.50000000  .00003000  00000-0  15000-3 0  9999", "2 25732  97.5000  80.0000 0150000 150.0000 210.0000 14.80000000    17"),
+    ("FALCON 9 R/B", "1 45678U 20020B   24001.50000000  .00005000  00000-0  25000-3 0  9999", "2 45678  53.0000 250.0000 0200000  20.0000 340.0000 15.20000000    17"),
+    ("DELTA 4 R/B", "1 28626U 05017B   24001.50000000  .00000500  00000-0  25000-4 0  9999", "2 28626  28.5000 120.0000 7300000 270.0000  90.0000  2.50000000    17"),
+    ("ARIANE 5 R/B", "1 37606U 11020B   24001.50000000  .00000300  00000-0  15000-4 0  9999", "2 37606   6.0000 340.0000 7100000 180.0000 180.0000  2.60000000    17"),
+    
+    # === Earth Observation ===
+    ("LANDSAT 9", "1 49260U 21088A   24001.50000000  .00000200  00000-0  10000-4 0  9999", "2 49260  98.2000 100.0000 0001500 120.0000 240.0000 14.57000000    17"),
+    ("SENTINEL-2A", "1 40697U 15028A   24001.50000000  .00000150  00000-0  75000-5 0  9999", "2 40697  98.5000 200.0000 0001200 150.0000 210.0000 14.31000000    17"),
+    ("WORLDVIEW-3", "1 40115U 14048A   24001.50000000  .00000300  00000-0  15000-4 0  9999", "2 40115  97.9000 280.0000 0002000  60.0000 300.0000 15.19000000    17"),
+    
+    # === Weather Satellites ===
+    ("GOES 16", "1 41866U 16071A   24001.50000000  .00000020  00000-0  00000+0 0  9999", "2 41866   0.0500 270.0000 0001500  90.0000 270.0000  1.00270000    17"),
+    ("GOES 18", "1 51850U 22021A   24001.50000000  .00000015  00000-0  00000+0 0  9999", "2 51850   0.0300 220.0000 0001200 120.0000 240.0000  1.00270000    17"),
+    ("NOAA 20", "1 43013U 17073A   24001.50000000  .00000180  00000-0  90000-5 0  9999", "2 43013  98.7000  50.0000 0001800 180.0000 180.0000 14.19000000    17"),
+]
+
+@lru_cache(maxsize=1)
+def build_fallback_satellites() -> Tuple[SatelliteData, ...]:
+    """Parse FALLBACK_TLES once; the TLEs are constant"""
+    satellites = []
+    for name, line1, line2 in FALLBACK_TLES:
+        parsed = parse_tle_line(line1, line2)
+        if parsed:
+            satellites.append(satellite_from_tle(name, line1, line2, parsed))
+    
+    return tuple(satellites)
 
 
 class DataFetcher:
@@ -138,192 +440,188 @@ class DataFetcher:
             "Accept": "text/plain, text/html, */*",
             "Accept-Language": "en-US,en;q=0.9",
             "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
         }
+        # Verified against certifi's CA bundle; built once and shared by every client
+        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}  # Caps concurrent requests per host
+        self.http_versions: Dict[str, str] = {}  # Protocol last negotiated with each host
     
-    async def fetch_tle_url(self, url: str, timeout: float = 30.0) -> List[SatelliteData]:
+    def open_client(self) -> httpx.AsyncClient:
+        """
+        HTTP client for a refresh. Sources on one host share a connection as
+        HTTP/2 streams where the server supports it, else a keep-alive pool.
+        """
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=15.0),
+            headers=self.headers,
+            follow_redirects=True,
+            transport=httpx.AsyncHTTPTransport(
+                verify=self.ssl_context,
+                http2=True,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            ),
+        )
+    
+    def host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent requests to the host of url"""
+        host = urlparse(url).hostname or ""
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(settings.fetch_concurrency_per_host)
+        return self.host_semaphores[host]
+    
+    async def get_with_retry(self, client: httpx.AsyncClient, url: str, timeout: float) -> httpx.Response:
+        """
+        Stream a GET of url, retrying timeouts, connect errors and RETRY_STATUS_CODES
+        with jittered exponential backoff. The caller must close the response.
+        """
+        request = client.build_request("GET", url, timeout=httpx.Timeout(timeout, connect=15.0))
+        for attempt in range(settings.fetch_attempts):
+            last_attempt = attempt == settings.fetch_attempts - 1
+            try:
+                response = await client.send(request, stream=True)
+            except (httpx.TimeoutException, httpx.ConnectError):
+                if last_attempt:
+                    raise
+            else:
+                if last_attempt or response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                # Drain the (small) error body so the retry reuses the connection;
+                # closing it unread would drop the connection and redo the TLS handshake
+                await response.aread()
+                await response.aclose()
+            await asyncio.sleep(random.uniform(0, 2 ** attempt))
+    
+    async def fetch_tle_url(self, url: str, timeout: float = 30.0,
+                            client: Optional[httpx.AsyncClient] = None) -> List[SatelliteData]:
         """Fetch TLE data from a specific URL with robust error handling"""
+        if client is None:
+            async with self.open_client() as client:
+                return await self.fetch_tle_url(url, timeout, client)
+        
+        reader = await self.read_tle_url(url, timeout, client)
+        return await asyncio.to_thread(reader.satellites)
+    
+    async def read_tle_url(self, url: str, timeout: float, client: httpx.AsyncClient) -> TLEReader:
+        """Download the TLEs at url without parsing them (empty if the fetch fails)"""
+        # Align lines as they arrive instead of holding the whole body as text
+        reader = TLEReader()
         try:
-            # Create SSL context with certifi certificates
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
+            async with self.host_semaphore(url):
+                response = await self.get_with_retry(client, url, timeout)
+                try:
+                    host = response.url.host
+                    if self.http_versions.get(host) != response.http_version:
+                        self.http_versions[host] = response.http_version
+                        logger.info("Using %s for %s", response.http_version, host)
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        reader.feed_bytes(chunk)
+                    reader.close()
+                finally:
+                    await response.aclose()
             
-            async with httpx.AsyncClient(
-                timeout=httpx.Timeout(timeout, connect=15.0),
-                headers=self.headers,
-                follow_redirects=True,
-                verify=ssl_context,
-                http2=True,  # Try HTTP/2 if available
-            ) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                return parse_tle_text(response.text)
+            return reader
         
         except httpx.TimeoutException as e:
-            logger.warning(f"Timeout fetching {url}: {e}")
-            return []
+            logger.warning("Timeout fetching %s: %s", url, e)
         except httpx.HTTPStatusError as e:
-            logger.warning(f"HTTP error {e.response.status_code} fetching {url}")
-            return []
+            logger.warning("HTTP error %d fetching %s", e.response.status_code, url)
         except Exception as e:
-            logger.error(f"Failed to fetch TLE from {url}: {e}")
-            return []
+            logger.error("Failed to fetch TLE from %s: %s", url, e)
+        return TLEReader()
+    
+    async def fetch_sources(self, sources: List[dict], client: httpx.AsyncClient,
+                            all_satellites: Dict[int, SatelliteData]) -> None:
+        """
+        Download several sources concurrently and parse them in source order
+        into all_satellites, skipping NORAD IDs it already holds. Each source is
+        parsed in a worker thread as soon as it and the sources before it have
+        arrived, so parsing overlaps the remaining downloads.
+        """
+        logger.info("  Fetching %s...", ", ".join(source["name"] for source in sources))
+        downloads = [
+            asyncio.create_task(self.read_tle_url(source["url"], timeout=45.0, client=client))
+            for source in sources
+        ]
+        for source, download in zip(sources, downloads):
+            reader = await download
+            satellites = await asyncio.to_thread(reader.satellites, all_satellites.keys())
+            all_satellites.update((sat.norad_id, sat) for sat in satellites)
+            
+            if reader:
+                logger.info("    ✓ Loaded %d satellites from %s (%d new)", len(reader), source["name"], len(satellites))
+            else:
+                logger.warning("    ✗ No data from %s", source["name"])
     
     async def fetch_all_tle_data(self):
         """Fetch TLE data from all sources with multiple fallbacks"""
         all_satellites = {}
         
-        # Strategy 1: Try primary CelesTrak GP API sources
-        logger.info("📡 Attempting primary CelesTrak sources...")
-        for source in TLE_SOURCES_PRIMARY:
-            logger.info(f"  Fetching {source['name']}...")
-            satellites = await self.fetch_tle_url(source["url"], timeout=45.0)
+        # One client for both strategies, so connections are reused across sources
+        async with self.open_client() as client:
+            # Strategy 1: Try primary CelesTrak GP API sources
+            logger.info("📡 Attempting primary CelesTrak sources...")
+            await self.fetch_sources(TLE_SOURCES_PRIMARY, client, all_satellites)
             
-            for sat in satellites:
-                if sat.norad_id not in all_satellites:
-                    all_satellites[sat.norad_id] = sat
-            
-            if satellites:
-                logger.info(f"    ✓ Loaded {len(satellites)} satellites")
-            else:
-                logger.warning(f"    ✗ No data from {source['name']}")
+            # Strategy 2: Try backup .txt sources if primary failed
+            if len(all_satellites) < 100:
+                logger.info("📡 Trying backup CelesTrak .txt sources...")
+                await self.fetch_sources(TLE_SOURCES_BACKUP, client, all_satellites)
         
-        # Strategy 2: Try backup .txt sources if primary failed
-        if len(all_satellites) < 100:
-            logger.info("📡 Trying backup CelesTrak .txt sources...")
-            for source in TLE_SOURCES_BACKUP:
-                logger.info(f"  Fetching {source['name']}...")
-                satellites = await self.fetch_tle_url(source["url"], timeout=45.0)
-                
-                for sat in satellites:
-                    if sat.norad_id not in all_satellites:
-                        all_satellites[sat.norad_id] = sat
-                
-                if satellites:
-                    logger.info(f"    ✓ Loaded {len(satellites)} satellites")
+        # Only remote data is worth keeping across restarts
+        if len(all_satellites) >= 10:
+            await asyncio.to_thread(self.save_disk_cache, list(all_satellites.values()))
         
         # Strategy 3: Use fallback sample data if all else fails
         if len(all_satellites) < 10:
             logger.warning("⚠️ All remote sources failed, using fallback sample data...")
-            fallback_satellites = self.get_fallback_satellites()
-            for sat in fallback_satellites:
-                all_satellites[sat.norad_id] = sat
-            logger.info(f"  Loaded {len(fallback_satellites)} fallback satellites")
+            fallback_satellites = build_fallback_satellites()  # Cached; no copy needed to read it
+            all_satellites.update({
+                sat.norad_id: sat for sat in fallback_satellites if sat.norad_id not in all_satellites
+            })
+            logger.info("  Loaded %d fallback satellites", len(fallback_satellites))
         
         # Update cache
         cache.update_satellites(list(all_satellites.values()))
         
-        logger.info(f"🛰️ Total satellites cached: {len(all_satellites)}")
+        logger.info("🛰️ Total satellites cached: %d", len(all_satellites))
         
         return len(all_satellites)
     
-    def get_fallback_satellites(self) -> List[SatelliteData]:
-        """Return comprehensive sample TLE data when APIs are unavailable"""
-        sample_tles = [
-            # === Space Stations ===
-            ("ISS (ZARYA)", "1 25544U 98067A   24001.50000000  .00016717  00000-0  10270-3 0  9025", "2 25544  51.6400 208.9163 0006703 167.7423 192.4284 15.50000000    12"),
-            ("CSS (TIANHE)", "1 48274U 21035A   24001.50000000  .00020000  00000-0  22000-3 0  9999", "2 48274  41.4700  50.0000 0005000 280.0000  80.0000 15.60000000    17"),
-            
-            # === Special Missions ===
-            ("HST", "1 20580U 90037B   24001.50000000  .00000880  00000-0  00000+0 0  9999", "2 20580  28.4700  85.0000 0002700 100.0000 260.0000 15.09000000    17"),
-            
-            # === GPS Constellation (31 operational) ===
-            ("GPS BIIR-2  (PRN 13)", "1 24876U 97035A   24001.50000000 -.00000020  00000-0  00000+0 0  9999", "2 24876  55.4000 150.0000 0100000  90.0000 270.0000  2.00550000    17"),
-            ("GPS BIIR-3  (PRN 11)", "1 25933U 99055A   24001.50000000  .00000010  00000-0  00000+0 0  9999", "2 25933  51.9000 210.0000 0150000 120.0000 240.0000  2.00560000    17"),
-            ("GPS BIIR-4  (PRN 20)", "1 26360U 00025A   24001.50000000 -.00000010  00000-0  00000+0 0  9999", "2 26360  53.0000  30.0000 0050000 200.0000 160.0000  2.00570000    17"),
-            ("GPS BIIR-5  (PRN 28)", "1 26407U 00040A   24001.50000000  .00000005  00000-0  00000+0 0  9999", "2 26407  56.7000  90.0000 0080000  45.0000 315.0000  2.00580000    17"),
-            ("GPS BIIF-1  (PRN 25)", "1 36585U 10022A   24001.50000000 -.00000005  00000-0  00000+0 0  9999", "2 36585  55.0000 270.0000 0120000 135.0000 225.0000  2.00590000    17"),
-            ("GPS BIIF-2  (PRN 01)", "1 37753U 11036A   24001.50000000  .00000008  00000-0  00000+0 0  9999", "2 37753  55.2000  60.0000 0090000 180.0000 180.0000  2.00545000    17"),
-            ("GPS BIIF-3  (PRN 24)", "1 38833U 12053A   24001.50000000 -.00000003  00000-0  00000+0 0  9999", "2 38833  54.8000 330.0000 0110000  75.0000 285.0000  2.00555000    17"),
-            ("GPS III-1  (PRN 04)", "1 43873U 18109A   24001.50000000  .00000012  00000-0  00000+0 0  9999", "2 43873  55.1000 120.0000 0070000 250.0000 110.0000  2.00565000    17"),
-            ("GPS III-2  (PRN 18)", "1 44506U 19056A   24001.50000000 -.00000007  00000-0  00000+0 0  9999", "2 44506  55.0000 180.0000 0080000 300.0000  60.0000  2.00575000    17"),
-            ("GPS III-3  (PRN 23)", "1 45854U 20041A   24001.50000000  .00000006  00000-0  00000+0 0  9999", "2 45854  55.3000 240.0000 0065000  15.0000 345.0000  2.00585000    17"),
-            
-            # === GLONASS Constellation ===
-            ("COSMOS 2459 (GLONASS)", "1 37867U 11064A   24001.50000000 -.00000010  00000-0  00000+0 0  9999", "2 37867  64.8000 100.0000 0010000 120.0000 240.0000  2.13000000    17"),
-            ("COSMOS 2460 (GLONASS)", "1 37868U 11064B   24001.50000000  .00000005  00000-0  00000+0 0  9999", "2 37868  64.8000 101.0000 0012000 115.0000 245.0000  2.13000000    17"),
-            ("COSMOS 2461 (GLONASS)", "1 37869U 11064C   24001.50000000 -.00000008  00000-0  00000+0 0  9999", "2 37869  64.8000 102.0000 0008000 110.0000 250.0000  2.13000000    17"),
-            ("COSMOS 2514 (GLONASS)", "1 43508U 18053A   24001.50000000  .00000003  00000-0  00000+0 0  9999", "2 43508  64.9000 160.0000 0015000 200.0000 160.0000  2.13100000    17"),
-            ("COSMOS 2545 (GLONASS)", "1 45358U 20018A   24001.50000000 -.00000006  00000-0  00000+0 0  9999", "2 45358  64.7000 220.0000 0009000 280.0000  80.0000  2.13050000    17"),
-            
-            # === Galileo Constellation ===
-            ("GALILEO 201 (E18)", "1 40544U 15017A   24001.50000000  .00000002  00000-0  00000+0 0  9999", "2 40544  56.0000  45.0000 0003000 200.0000 160.0000  1.70000000    17"),
-            ("GALILEO 202 (E14)", "1 40545U 15017B   24001.50000000  .00000001  00000-0  00000+0 0  9999", "2 40545  56.0000  46.0000 0004000 195.0000 165.0000  1.70000000    17"),
-            ("GALILEO 203 (E26)", "1 40889U 15045A   24001.50000000 -.00000002  00000-0  00000+0 0  9999", "2 40889  55.8000 105.0000 0005000 250.0000 110.0000  1.70050000    17"),
-            ("GALILEO 204 (E22)", "1 40890U 15045B   24001.50000000  .00000003  00000-0  00000+0 0  9999", "2 40890  55.9000 106.0000 0003500 240.0000 120.0000  1.70025000    17"),
-            
-            # === Iridium NEXT Constellation ===
-            ("IRIDIUM 100", "1 41917U 17003A   24001.50000000  .00000080  00000-0  20000-4 0  9999", "2 41917  86.4000  60.0000 0002000  90.0000 270.0000 14.34000000    17"),
-            ("IRIDIUM 102", "1 41918U 17003B   24001.50000000  .00000075  00000-0  18000-4 0  9999", "2 41918  86.4000  61.0000 0002200  85.0000 275.0000 14.34000000    17"),
-            ("IRIDIUM 103", "1 41919U 17003C   24001.50000000  .00000085  00000-0  22000-4 0  9999", "2 41919  86.4000  62.0000 0001800  80.0000 280.0000 14.34000000    17"),
-            ("IRIDIUM 104", "1 41920U 17003D   24001.50000000  .00000070  00000-0  16000-4 0  9999", "2 41920  86.4000  63.0000 0002400  75.0000 285.0000 14.34000000    17"),
-            ("IRIDIUM 105", "1 41921U 17003E   24001.50000000  .00000090  00000-0  24000-4 0  9999", "2 41921  86.4000  64.0000 0001600  70.0000 290.0000 14.34000000    17"),
-            ("IRIDIUM 106", "1 41922U 17003F   24001.50000000  .00000078  00000-0  19000-4 0  9999", "2 41922  86.4000  65.0000 0001900  65.0000 295.0000 14.34000000    17"),
-            ("IRIDIUM 107", "1 41923U 17003G   24001.50000000  .00000082  00000-0  21000-4 0  9999", "2 41923  86.4000  66.0000 0002100  60.0000 300.0000 14.34000000    17"),
-            ("IRIDIUM 108", "1 41924U 17003H   24001.50000000  .00000072  00000-0  17000-4 0  9999", "2 41924  86.4000  67.0000 0001700  55.0000 305.0000 14.34000000    17"),
-            
-            # === Starlink Samples (representative set across shells) ===
-            ("STARLINK-1007", "1 44713U 19074A   24001.50000000  .00020000  00000-0  10000-3 0  9999", "2 44713  53.0000 120.0000 0001500  90.0000 270.0000 15.06000000    17"),
-            ("STARLINK-1008", "1 44714U 19074B   24001.50000000  .00018000  00000-0  95000-4 0  9999", "2 44714  53.0000 121.0000 0001200  85.0000 275.0000 15.06000000    17"),
-            ("STARLINK-1009", "1 44715U 19074C   24001.50000000  .00019000  00000-0  98000-4 0  9999", "2 44715  53.0000 122.0000 0001800  80.0000 280.0000 15.06000000    17"),
-            ("STARLINK-1010", "1 44716U 19074D   24001.50000000  .00017000  00000-0  92000-4 0  9999", "2 44716  53.0000 123.0000 0001100  75.0000 285.0000 15.06000000    17"),
-            ("STARLINK-1011", "1 44717U 19074E   24001.50000000  .00016000  00000-0  88000-4 0  9999", "2 44717  53.0000 124.0000 0001400  70.0000 290.0000 15.06000000    17"),
-            ("STARLINK-1012", "1 44718U 19074F   24001.50000000  .00021000  00000-0  11000-3 0  9999", "2 44718  53.0000 125.0000 0001600  65.0000 295.0000 15.06000000    17"),
-            ("STARLINK-1013", "1 44719U 19074G   24001.50000000  .00015000  00000-0  85000-4 0  9999", "2 44719  53.0000 126.0000 0001300  60.0000 300.0000 15.06000000    17"),
-            ("STARLINK-1014", "1 44720U 19074H   24001.50000000  .00022000  00000-0  12000-3 0  9999", "2 44720  53.0000 127.0000 0001000  55.0000 305.0000 15.06000000    17"),
-            ("STARLINK-1015", "1 44721U 19074J   24001.50000000  .00014000  00000-0  80000-4 0  9999", "2 44721  53.0000 128.0000 0001700  50.0000 310.0000 15.06000000    17"),
-            ("STARLINK-1016", "1 44722U 19074K   24001.50000000  .00023000  00000-0  13000-3 0  9999", "2 44722  53.0000 129.0000 0001900  45.0000 315.0000 15.06000000    17"),
-            ("STARLINK-2000", "1 47183U 20088A   24001.50000000  .00019500  00000-0  99000-4 0  9999", "2 47183  53.0000 200.0000 0001300 100.0000 260.0000 15.06000000    17"),
-            ("STARLINK-2001", "1 47184U 20088B   24001.50000000  .00018500  00000-0  94000-4 0  9999", "2 47184  53.0000 201.0000 0001500  95.0000 265.0000 15.06000000    17"),
-            ("STARLINK-3000", "1 50000U 21001A   24001.50000000  .00020500  00000-0  10500-3 0  9999", "2 50000  53.2000  50.0000 0001200 150.0000 210.0000 15.06000000    17"),
-            ("STARLINK-3001", "1 50001U 21001B   24001.50000000  .00019800  00000-0  10100-3 0  9999", "2 50001  53.2000  51.0000 0001400 145.0000 215.0000 15.06000000    17"),
-            
-            # === OneWeb Samples ===
-            ("ONEWEB-0012", "1 44057U 19010A   24001.50000000  .00000100  00000-0  10000-4 0  9999", "2 44057  87.9000 180.0000 0001500  45.0000 315.0000 13.15000000    17"),
-            ("ONEWEB-0013", "1 44058U 19010B   24001.50000000  .00000095  00000-0  95000-5 0  9999", "2 44058  87.9000 181.0000 0001700  40.0000 320.0000 13.15000000    17"),
-            ("ONEWEB-0014", "1 44059U 19010C   24001.50000000  .00000105  00000-0  11000-4 0  9999", "2 44059  87.9000 182.0000 0001300  35.0000 325.0000 13.15000000    17"),
-            ("ONEWEB-0015", "1 44060U 19010D   24001.50000000  .00000088  00000-0  88000-5 0  9999", "2 44060  87.9000 183.0000 0001900  30.0000 330.0000 13.15000000    17"),
-            ("ONEWEB-0100", "1 45132U 20008A   24001.50000000  .00000092  00000-0  92000-5 0  9999", "2 45132  87.9000 250.0000 0001400  70.0000 290.0000 13.15000000    17"),
-            ("ONEWEB-0101", "1 45133U 20008B   24001.50000000  .00000098  00000-0  98000-5 0  9999", "2 45133  87.9000 251.0000 0001600  65.0000 295.0000 13.15000000    17"),
-            
-            # === Debris Samples ===
-            ("COSMOS 2251 DEB", "1 34454U 93036PX  24001.50000000  .00002000  00000-0  10000-3 0  9999", "2 34454  74.0000 200.0000 0100000  60.0000 300.0000 14.50000000    17"),
-            ("FENGYUN 1C DEB", "1 31141U 99025ANF 24001.50000000  .00001500  00000-0  80000-4 0  9999", "2 31141  99.0000 150.0000 0080000 100.0000 260.0000 14.20000000    17"),
-            ("COSMOS 1408 DEB", "1 49127U 21109A   24001.50000000  .00003500  00000-0  18000-3 0  9999", "2 49127  82.5000  75.0000 0120000 130.0000 230.0000 14.90000000    17"),
-            ("IRIDIUM 33 DEB", "1 33776U 09005A   24001.50000000  .00001800  00000-0  90000-4 0  9999", "2 33776  86.4000 300.0000 0050000  20.0000 340.0000 14.60000000    17"),
-            
-            # === Rocket Bodies ===
-            ("CZ-2C R/B", "1 25732U 99025B   24001.50000000  .00003000  00000-0  15000-3 0  9999", "2 25732  97.5000  80.0000 0150000 150.0000 210.0000 14.80000000    17"),
-            ("FALCON 9 R/B", "1 45678U 20020B   24001.50000000  .00005000  00000-0  25000-3 0  9999", "2 45678  53.0000 250.0000 0200000  20.0000 340.0000 15.20000000    17"),
-            ("DELTA 4 R/B", "1 28626U 05017B   24001.50000000  .00000500  00000-0  25000-4 0  9999", "2 28626  28.5000 120.0000 7300000 270.0000  90.0000  2.50000000    17"),
-            ("ARIANE 5 R/B", "1 37606U 11020B   24001.50000000  .00000300  00000-0  15000-4 0  9999", "2 37606   6.0000 340.0000 7100000 180.0000 180.0000  2.60000000    17"),
-            
-            # === Earth Observation ===
-            ("LANDSAT 9", "1 49260U 21088A   24001.50000000  .00000200  00000-0  10000-4 0  9999", "2 49260  98.2000 100.0000 0001500 120.0000 240.0000 14.57000000    17"),
-            ("SENTINEL-2A", "1 40697U 15028A   24001.50000000  .00000150  00000-0  75000-5 0  9999", "2 40697  98.5000 200.0000 0001200 150.0000 210.0000 14.31000000    17"),
-            ("WORLDVIEW-3", "1 40115U 14048A   24001.50000000  .00000300  00000-0  15000-4 0  9999", "2 40115  97.9000 280.0000 0002000  60.0000 300.0000 15.19000000    17"),
-            
-            # === Weather Satellites ===
-            ("GOES 16", "1 41866U 16071A   24001.50000000  .00000020  00000-0  00000+0 0  9999", "2 41866   0.0500 270.0000 0001500  90.0000 270.0000  1.00270000    17"),
-            ("GOES 18", "1 51850U 22021A   24001.50000000  .00000015  00000-0  00000+0 0  9999", "2 51850   0.0300 220.0000 0001200 120.0000 240.0000  1.00270000    17"),
-            ("NOAA 20", "1 43013U 17073A   24001.50000000  .00000180  00000-0  90000-5 0  9999", "2 43013  98.7000  50.0000 0001800 180.0000 180.0000 14.19000000    17"),
-        ]
-        
-        satellites = []
-        for name, line1, line2 in sample_tles:
-            parsed = parse_tle_line(line1, line2)
-            if parsed:
-                sat = SatelliteData(
-                    norad_id=parsed["norad_id"],
-                    name=name,
-                    line1=line1,
-                    line2=line2,
-                    satellite_type=determine_satellite_type(name),
-                    altitude=parsed.get("altitude"),
-                    inclination=parsed.get("inclination"),
-                    eccentricity=parsed.get("eccentricity"),
-                    period=parsed.get("period"),
-                )
-                satellites.append(sat)
+    def load_disk_cache(self) -> int:
+        """Load the TLEs saved by a recent fetch into the cache; returns 0 if none are fresh enough"""
+        path = Path(settings.tle_cache_path)
+        try:
+            if time.time() - path.stat().st_mtime > settings.tle_cache_max_age_hours * 3600:
+                return 0
+            satellites = parse_tle_text(path.read_text())
+        except (OSError, ValueError):
+            return 0
         
-        return satellites
+        if satellites:
+            cache.update_satellites(satellites)
+            logger.info("💾 Loaded %d satellites from %s", len(satellites), path)
+        return len(satellites)
+    
+    def save_disk_cache(self, satellites: List[SatelliteData]):
+        """Write satellites to settings.tle_cache_path as TLE text for load_disk_cache"""
+        path = Path(settings.tle_cache_path)
+        temp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A unique temp file per writer, since every worker process saves after its fetch
+            with tempfile.NamedTemporaryFile(
+                "w", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+            ) as temp_file:
+                temp_path = temp_file.name
+                temp_file.write("".join(f"{sat.name}\n{sat.line1}\n{sat.line2}\n" for sat in satellites))
+            os.replace(temp_path, path)  # Readers never see a partial file
+            temp_path = None
+        except OSError as e:
+            logger.warning("Failed to save TLE cache to %s: %s", path, e)
+        finally:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
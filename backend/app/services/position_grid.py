@@ -0,0 +1,175 @@
+"""
+Shared SGP4 position grid for all cached satellites
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from sgp4.api import SatrecArray, jday
+
+from app.services.cache import cache, SATREC_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Satellites per SGP4 call while building (see SATREC_CHUNK_SIZE); halved because
+# each one is propagated over every grid epoch
+GRID_CHUNK_SIZE = SATREC_CHUNK_SIZE // 2
+
+
+@lru_cache(maxsize=16)
+def midnight_jd(year: int, month: int, day: int) -> float:
+    """Julian date of the midnight starting a calendar day"""
+    return jday(year, month, day, 0, 0, 0)[0]
+
+
+def jday_grid(start: datetime, step: timedelta, steps: int) -> tuple:
+    """
+    Julian date arrays (jd, fr) for `steps` evenly spaced epochs from start.
+    Same values as jday(); only the time of day is computed per call.
+    """
+    seconds = start.second + start.microsecond / 1e6
+    fr0 = (seconds + start.minute * 60.0 + start.hour * 3600.0) / 86400.0
+    fr = fr0 + np.arange(steps) * (step.total_seconds() / 86400.0)
+    return np.full(steps, midnight_jd(start.year, start.month, start.day)), fr
+
+
+@dataclass
+class PositionGrid:
+    """TEME positions of every cached satellite on a common time grid"""
+    start: datetime
+    step: timedelta
+    jd: np.ndarray
+    fr: np.ndarray
+    rows: Dict[int, int]  # NORAD ID -> row in positions/velocities/failed
+    positions: np.ndarray  # (satellites, epochs, 3) float32, km
+    velocities: np.ndarray  # (satellites, epochs, 3) float32, km/s
+    failed: np.ndarray  # (satellites, epochs) bool, SGP4 error flag
+    source_update: Optional[datetime]  # cache.last_update the grid was built from
+    
+    def window(self, norad_ids: List[int], start: datetime, step: timedelta, steps: int) -> Optional[tuple]:
+        """
+        Slice `steps` epochs starting at the first grid epoch at or after start.
+        
+        Returns (window start, jd, fr, positions, velocities, failed) with rows in
+        the order of norad_ids, or None if the grid cannot serve the request.
+        """
+        if step != self.step or self.source_update != cache.last_update or start < self.start:
+            return None
+        
+        first = -(-(start - self.start) // self.step)
+        if first + steps > len(self.fr):
+            return None
+        
+        try:
+            rows = [self.rows[norad_id] for norad_id in norad_ids]
+        except KeyError:
+            return None
+        
+        epochs = slice(first, first + steps)
+        return (
+            self.start + self.step * first,
+            self.jd[epochs],
+            self.fr[epochs],
+            self.positions[rows, epochs].astype(np.float64),
+            self.velocities[rows, epochs].astype(np.float64),
+            self.failed[rows, epochs],
+        )
+
+
+class PositionGridService:
+    """Keeps a rolling position grid covering the next hour up to date"""
+    
+    def __init__(self):
+        self.grid: Optional[PositionGrid] = None
+        self.step = timedelta(minutes=5)
+        self.horizon = timedelta(minutes=60)
+        self.check_interval = 60  # Seconds between staleness checks
+        self.max_age = timedelta(minutes=5)  # Rebuild once the grid start is this old
+        self._task: Optional[asyncio.Task] = None
+    
+    def is_stale(self, now: datetime) -> bool:
+        """Check whether the grid must be rebuilt"""
+        grid = self.grid
+        return (
+            grid is None
+            or grid.source_update != cache.last_update
+            or now - grid.start > self.max_age
+        )
+    
+    def build(self, now: datetime) -> PositionGrid:
+        """Propagate every cached satellite over the horizon (plus max_age of slack)"""
+        snapshot = cache.snapshot
+        source_update = snapshot.last_update
+        satrecs = snapshot.satrecs
+        norad_ids = list(satrecs)
+        
+        # Align the grid to step boundaries so successive builds share epochs
+        step_seconds = int(self.step.total_seconds())
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = int((now - midnight).total_seconds()) // step_seconds * step_seconds
+        start = midnight + timedelta(seconds=offset)
+        
+        steps = int((self.horizon + self.max_age) / self.step) + 1
+        jd, fr = jday_grid(start, self.step, steps)
+        
+        positions = np.empty((len(norad_ids), steps, 3), dtype=np.float32)
+        velocities = np.empty((len(norad_ids), steps, 3), dtype=np.float32)
+        failed = np.empty((len(norad_ids), steps), dtype=bool)
+        for first in range(0, len(norad_ids), GRID_CHUNK_SIZE):
+            rows = slice(first, first + GRID_CHUNK_SIZE)
+            e, r, v = SatrecArray([satrecs[norad_id] for norad_id in norad_ids[rows]]).sgp4(jd, fr)
+            positions[rows] = r
+            velocities[rows] = v
+            failed[rows] = e != 0
+        
+        return PositionGrid(
+            start=start,
+            step=self.step,
+            jd=jd,
+            fr=fr,
+            rows={norad_id: row for row, norad_id in enumerate(norad_ids)},
+            positions=positions,
+            velocities=velocities,
+            failed=failed,
+            source_update=source_update,
+        )
+    
+    async def refresh(self):
+        """Rebuild the grid off the event loop if it is stale"""
+        now = datetime.utcnow()
+        if self.is_stale(now):
+            self.grid = await asyncio.to_thread(self.build, now)
+            logger.info(
+                f"Built position grid: {len(self.grid.rows)} satellites x {len(self.grid.fr)} epochs"
+            )
+    
+    async def _refresh_loop(self):
+        """Periodically rebuild the grid"""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Position grid error: {e}")
+            await asyncio.sleep(self.check_interval)
+    
+    def start(self):
+        """Start the background refresh task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+    
+    def stop(self):
+        """Stop the background refresh task"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Global position grid instance
+position_grid = PositionGridService()
@@ -3,16 +3,16 @@ WebSocket manager for real-time satellite position updates
 """
 
 import asyncio
-import json
 import logging
-from typing import Dict, List, Set, Optional
-from datetime import datetime
-from dataclasses import dataclass
+import time
+from typing import Dict, Optional, Tuple
 from fastapi import WebSocket, WebSocketDisconnect
-from sgp4.api import Satrec, jday
 import math
+import zlib
+import numpy as np
+import orjson
 
-from app.services.cache import cache, SatelliteData
+from app.services.cache import cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,38 +20,60 @@ logger = logging.getLogger(__name__)
 EARTH_RADIUS_KM = 6371
 SCALE_FACTOR = 1 / 1000  # Scale down for Three.js
 
+# Binary position frame: a 16-byte header followed by one column per field, each holding
+# `count` little-endian values (NORAD IDs as u32, then the POSITION_FIELDS as f32).
+# Keyframes carry every satellite; other frames only those that moved since last sent.
+# The leading kind byte can never be '{', so clients can tell it apart from JSON frames.
+# Broadcasts send it compressed: the deflate kind byte followed by the zlib-compressed frame.
+POSITIONS_FRAME_KIND = 1
+POSITIONS_DEFLATE_FRAME_KIND = 2
+POSITIONS_HEADER_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("flags", "u1"),
+    ("reserved", "u1", (2,)),
+    ("count", "<u4"),
+    ("timestamp", "<f8"),  # Milliseconds since the Unix epoch
+])
+POSITIONS_FLAG_KEYFRAME = 1
+POSITION_ID_DTYPE = np.dtype("<u4")
+POSITION_VALUE_DTYPE = np.dtype("<f4")
+POSITION_FIELDS = ("x", "y", "z", "latitude", "longitude", "altitude", "velocity")
+UNIX_EPOCH_JD = 2440587.5  # Julian date of 1970-01-01 00:00 UTC
 
-@dataclass
-class SatellitePosition:
-    """Satellite position data"""
-    norad_id: int
-    name: str
-    x: float
-    y: float
-    z: float
-    latitude: float
-    longitude: float
-    altitude: float
-    velocity: float
-    satellite_type: str
+# Pre-encoded control messages; only the variable parts are serialized per send
+PING_MESSAGE = b'{"type":"ping"}'
+PONG_PREFIX = b'{"type":"pong","timestamp":'
 
 
 class ConnectionManager:
     """Manages WebSocket connections and broadcasts"""
     
     def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}  # Outbound ASGI messages per client
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
+        self.queue_size = 8  # Frames buffered per client before the oldest is dropped
         self.broadcast_task: Optional[asyncio.Task] = None
         self.is_broadcasting = False
         self.update_interval = 1.0  # Seconds between updates
-        self.batch_size = 500  # Satellites per batch
+        self.compression_level = 3  # zlib level for position frames, compressed once per tick
         self._lock = asyncio.Lock()
+        self._has_clients = asyncio.Event()  # Set while active_connections is non-empty
+        
+        # Delta frames: positions last sent per satellite, and when to send everything again
+        self.delta_threshold_km = 1.0  # Movement below this is not resent until the next keyframe
+        self.keyframe_interval = 30.0  # Seconds between keyframes
+        self._last_sent: Optional[Tuple[np.ndarray, np.ndarray]] = None  # (NORAD IDs, (3, N) x/y/z)
+        self._last_keyframe = 0.0
+        self._keyframe_due = True  # Set when a client may be missing satellites
     
     async def connect(self, websocket: WebSocket):
         """Accept a new WebSocket connection"""
         await websocket.accept()
         async with self._lock:
-            self.active_connections.add(websocket)
+            self.active_connections[websocket] = asyncio.Queue(maxsize=self.queue_size)
+            self._writers[websocket] = asyncio.create_task(self._writer(websocket))
+            self._has_clients.set()
+            self._keyframe_due = True  # The new client has no positions yet
         logger.info(f"Client connected. Total connections: {len(self.active_connections)}")
         
         # Send initial connection confirmation
@@ -69,7 +91,12 @@ class ConnectionManager:
     async def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
         async with self._lock:
-            self.active_connections.discard(websocket)
+            self.active_connections.pop(websocket, None)
+            writer = self._writers.pop(websocket, None)
+            if not self.active_connections:
+                self._has_clients.clear()
+        if writer and writer is not asyncio.current_task():
+            writer.cancel()
         logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
         
         # Stop broadcasting if no connections
@@ -95,20 +122,21 @@ class ConnectionManager:
         """Main broadcast loop - calculates and sends positions"""
         while self.is_broadcasting:
             try:
-                if self.active_connections:
-                    # Calculate positions for all satellites
-                    positions = await self._calculate_all_positions()
-                    
-                    # Send in batches to avoid overwhelming clients
-                    for i in range(0, len(positions), self.batch_size):
-                        batch = positions[i:i + self.batch_size]
-                        await self._broadcast({
-                            "type": "positions",
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "batch_index": i // self.batch_size,
-                            "total_batches": math.ceil(len(positions) / self.batch_size),
-                            "satellites": [self._position_to_dict(p) for p in batch],
-                        })
+                # Block, rather than poll, while nobody is connected
+                await self._has_clients.wait()
+                
+                # Calculate positions for all satellites
+                now = time.time()
+                # Propagation and compression run off the event loop so sends keep draining;
+                # the delta selection stays on the loop, where connect() flags keyframes
+                norad_ids, values = await asyncio.to_thread(self._calculate_all_positions, now)
+                keyframe, sent = self._select_changes(norad_ids, values, now)
+                frame = await asyncio.to_thread(
+                    self._encode_positions, norad_ids[sent], values[:, sent], now, keyframe
+                )
+                
+                # One binary frame per tick, shared by every client
+                await self.broadcast_bytes(frame)
                 
                 await asyncio.sleep(self.update_interval)
                 
@@ -118,138 +146,174 @@ class ConnectionManager:
                 logger.error(f"Broadcast error: {e}")
                 await asyncio.sleep(1)  # Brief pause on error
     
-    async def _broadcast(self, message: dict):
-        """Send message to all connected clients"""
-        if not self.active_connections:
-            return
-        
-        message_json = json.dumps(message)
-        disconnected = set()
-        
-        for connection in self.active_connections.copy():
+    async def broadcast_bytes(self, payload: bytes):
+        """Queue a pre-encoded payload for every client without waiting on any socket"""
+        # One ASGI send message shared by every client; servers only read it
+        message = {"type": "websocket.send", "bytes": payload}
+        for queue in tuple(self.active_connections.values()):
+            if queue.full():
+                # Slow client: drop its oldest frame so it catches up on the latest positions,
+                # and resend everything next tick since the dropped frame may have been a delta
+                queue.get_nowait()
+                self._keyframe_due = True
+            queue.put_nowait(message)
+    
+    async def _writer(self, websocket: WebSocket):
+        """Drain one client's queue onto its socket until a send fails"""
+        queue = self.active_connections[websocket]
+        while True:
+            message = await queue.get()
             try:
-                await connection.send_text(message_json)
+                await websocket.send(message)
             except Exception as e:
                 logger.warning(f"Failed to send to client: {e}")
-                disconnected.add(connection)
+                break
         
-        # Clean up disconnected clients
-        if disconnected:
-            async with self._lock:
-                self.active_connections -= disconnected
+        async with self._lock:
+            self.active_connections.pop(websocket, None)
+            self._writers.pop(websocket, None)
+            if not self.active_connections:
+                self._has_clients.clear()
     
     async def send_personal_message(self, websocket: WebSocket, message: dict):
         """Send message to a specific client"""
+        await self.send_personal_bytes(websocket, orjson.dumps(message))
+    
+    async def send_personal_bytes(self, websocket: WebSocket, payload: bytes):
+        """Send a pre-encoded JSON message to a specific client"""
         try:
-            await websocket.send_json(message)
+            await websocket.send_bytes(payload)
         except Exception as e:
             logger.warning(f"Failed to send personal message: {e}")
     
-    async def _calculate_all_positions(self) -> List[SatellitePosition]:
-        """Calculate current positions for all satellites"""
-        positions = []
-        now = datetime.utcnow()
-        jd, fr = jday(now.year, now.month, now.day, 
-                     now.hour, now.minute, now.second + now.microsecond / 1e6)
+    async def send_ping(self, websocket: WebSocket):
+        """Send a keep-alive ping"""
+        await self.send_personal_bytes(websocket, PING_MESSAGE)
+    
+    async def send_pong(self, websocket: WebSocket, timestamp):
+        """Answer a client ping, echoing its timestamp"""
+        await self.send_personal_bytes(websocket, PONG_PREFIX + orjson.dumps(timestamp) + b"}")
+    
+    def _calculate_all_positions(self, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate positions at Unix time `now` for all satellites.
+        Returns (NORAD IDs, (len(POSITION_FIELDS), N) values) in the frame dtypes.
+        """
+        snapshot = cache.snapshot
+        jd, fr = self._julian_date(now)
         
-        for sat_data in cache.get_all_satellites():
-            try:
-                pos = self._calculate_position(sat_data, jd, fr)
-                if pos:
-                    positions.append(pos)
-            except Exception as e:
-                # Skip satellites with calculation errors
-                pass
+        # Earth rotation is the same for every satellite in this tick
+        gmst = self._calculate_gmst(jd, fr)
+        rotation = (math.cos(gmst), math.sin(gmst))
+        
+        # Propagate the catalog one SatrecArray chunk at a time (see SATREC_CHUNK_SIZE)
+        count = len(snapshot.satrec_norad_ids)
+        jd_array, fr_array = np.array([jd]), np.array([fr])
+        e = np.empty(count, dtype=np.uint8)
+        r = np.empty((count, 3))
+        v = np.empty((count, 3))
+        first = 0
+        for satrec_array in snapshot.satrec_arrays:
+            chunk_e, chunk_r, chunk_v = satrec_array.sgp4(jd_array, fr_array)
+            rows = slice(first, first + len(chunk_e))
+            e[rows], r[rows], v[rows] = chunk_e[:, 0], chunk_r[:, 0], chunk_v[:, 0]
+            first = rows.stop
+        
+        # Skip propagation errors
+        ok = e == 0
+        failed = len(ok) - np.count_nonzero(ok)
+        if failed:
+            logger.debug(f"Skipped {failed} satellites with SGP4 errors")
         
-        return positions
+        # Fill the frame columns directly; no per-satellite objects are built
+        norad_ids = snapshot.satrec_norad_ids[ok] if failed else snapshot.satrec_norad_ids
+        values = np.empty((len(POSITION_FIELDS), len(norad_ids)), dtype=POSITION_VALUE_DTYPE)
+        for column, field_values in zip(values, self._transform_states(r[ok], v[ok], rotation)):
+            column[:] = field_values
+        return norad_ids, values
     
-    def _calculate_position(self, sat: SatelliteData, jd: float, fr: float) -> Optional[SatellitePosition]:
-        """Calculate position for a single satellite using SGP4"""
-        try:
-            # Create SGP4 satellite object
-            satrec = Satrec.twoline2rv(sat.line1, sat.line2)
-            
-            # Propagate to current time
-            e, r, v = satrec.sgp4(jd, fr)
-            
-            if e != 0:  # Propagation error
-                return None
-            
-            # r is position in km (ECI coordinates)
-            # v is velocity in km/s
-            x_eci, y_eci, z_eci = r
-            vx, vy, vz = v
-            
-            # Convert ECI to ECEF (simplified - ignoring Earth rotation for now)
-            # For accurate conversion, we'd need GMST calculation
-            gmst = self._calculate_gmst(jd, fr)
-            cos_gmst = math.cos(gmst)
-            sin_gmst = math.sin(gmst)
-            
-            x_ecef = x_eci * cos_gmst + y_eci * sin_gmst
-            y_ecef = -x_eci * sin_gmst + y_eci * cos_gmst
-            z_ecef = z_eci
-            
-            # Calculate geodetic coordinates
-            r_mag = math.sqrt(x_ecef**2 + y_ecef**2 + z_ecef**2)
-            latitude = math.degrees(math.asin(z_ecef / r_mag))
-            longitude = math.degrees(math.atan2(y_ecef, x_ecef))
-            altitude = r_mag - EARTH_RADIUS_KM
-            
-            # Calculate velocity magnitude
-            velocity = math.sqrt(vx**2 + vy**2 + vz**2)
-            
-            # Scale positions for Three.js (using same scale as frontend)
-            scale = EARTH_RADIUS_KM * SCALE_FACTOR
-            scaled_radius = (EARTH_RADIUS_KM + altitude) * SCALE_FACTOR
-            
-            # Convert lat/lng to 3D coordinates (same as frontend)
-            lat_rad = math.radians(latitude)
-            lng_rad = math.radians(longitude)
-            
-            x_3d = scaled_radius * math.cos(lat_rad) * math.cos(lng_rad)
-            y_3d = scaled_radius * math.sin(lat_rad)
-            z_3d = -scaled_radius * math.cos(lat_rad) * math.sin(lng_rad)
-            
-            return SatellitePosition(
-                norad_id=sat.norad_id,
-                name=sat.name,
-                x=round(x_3d, 6),
-                y=round(y_3d, 6),
-                z=round(z_3d, 6),
-                latitude=round(latitude, 4),
-                longitude=round(longitude, 4),
-                altitude=round(altitude, 2),
-                velocity=round(velocity, 3),
-                satellite_type=sat.satellite_type,
-            )
-            
-        except Exception as e:
-            return None
+    def _select_changes(self, norad_ids: np.ndarray, values: np.ndarray, now: float) -> tuple:
+        """
+        Decide what this tick sends: (True, all rows) for a keyframe, otherwise
+        (False, mask of satellites that moved delta_threshold_km since last sent)
+        """
+        xyz = values[:3]
+        last = self._last_sent
+        if (
+            self._keyframe_due
+            or last is None
+            or now - self._last_keyframe >= self.keyframe_interval
+            # Catalog refreshed or propagation failures changed (same array object while neither has)
+            or (last[0] is not norad_ids and not np.array_equal(last[0], norad_ids))
+        ):
+            self._keyframe_due = False
+            self._last_keyframe = now
+            self._last_sent = (norad_ids, xyz.copy())
+            return True, slice(None)
+        
+        # Compare against the last position sent, not the last tick, so slow drift still goes out
+        delta = xyz - last[1]
+        moved = np.einsum("ij,ij->j", delta, delta) > (self.delta_threshold_km * SCALE_FACTOR) ** 2
+        last[1][:, moved] = xyz[:, moved]
+        return False, moved
+    
+    def _transform_states(self, r: np.ndarray, v: np.ndarray,
+                          rotation: Tuple[float, float]) -> Tuple[np.ndarray, ...]:
+        """
+        Convert (N, 3) ECI positions (km) and velocities (km/s) to Three.js
+        x, y, z, latitude, longitude, altitude and speed arrays; rotation is (cos, sin) of GMST
+        """
+        # The frontend's lat/lng -> 3D mapping at radius |r| is just the ECEF axes permuted
+        # to (x, z, -y), so fold SCALE_FACTOR and that permutation into the GMST rotation
+        # and produce scene coordinates straight from ECI (z is unchanged by the rotation)
+        cos_gmst, sin_gmst = rotation
+        cos_scaled, sin_scaled = cos_gmst * SCALE_FACTOR, sin_gmst * SCALE_FACTOR
+        x_eci, y_eci, z_eci = r[:, 0], r[:, 1], r[:, 2]
+        x_3d = x_eci * cos_scaled + y_eci * sin_scaled
+        y_3d = z_eci * SCALE_FACTOR
+        z_3d = x_eci * sin_scaled - y_eci * cos_scaled
+        
+        # Calculate geodetic coordinates (rotation about z leaves |r| unchanged, and
+        # arctan2 is unchanged by the common scale)
+        r_mag = np.sqrt(np.einsum("ij,ij->i", r, r))
+        lat_rad = np.arcsin(z_eci / r_mag)
+        lng_rad = np.arctan2(-z_3d, x_3d)
+        altitude = r_mag - EARTH_RADIUS_KM
+        
+        # Calculate velocity magnitude
+        velocity = np.sqrt(np.einsum("ij,ij->i", v, v))
+        
+        # No rounding: the frame stores float32, which already bounds the precision sent
+        return x_3d, y_3d, z_3d, np.degrees(lat_rad), np.degrees(lng_rad), altitude, velocity
+    
+    def _julian_date(self, now: float) -> Tuple[float, float]:
+        """(jd, fr) for a Unix time, split at midnight like sgp4's jday()"""
+        days, seconds = divmod(now, 86400.0)
+        return UNIX_EPOCH_JD + days, seconds / 86400.0
     
     def _calculate_gmst(self, jd: float, fr: float) -> float:
         """Calculate Greenwich Mean Sidereal Time in radians"""
-        # Julian centuries from J2000.0
-        t = ((jd - 2451545.0) + fr) / 36525.0
+        # Days and Julian centuries from J2000.0
+        days = (jd - 2451545.0) + fr
+        t = days / 36525.0
         
         # GMST in degrees
-        gmst_deg = (280.46061837 + 360.98564736629 * ((jd - 2451545.0) + fr) +
+        gmst_deg = (280.46061837 + 360.98564736629 * days +
                    0.000387933 * t**2 - t**3 / 38710000.0) % 360.0
         
         return math.radians(gmst_deg)
     
-    def _position_to_dict(self, pos: SatellitePosition) -> dict:
-        """Convert SatellitePosition to dictionary"""
-        return {
-            "noradId": pos.norad_id,
-            "name": pos.name,
-            "position": {"x": pos.x, "y": pos.y, "z": pos.z},
-            "latitude": pos.latitude,
-            "longitude": pos.longitude,
-            "altitude": pos.altitude,
-            "velocity": pos.velocity,
-            "type": pos.satellite_type,
-        }
+    def _encode_positions(self, norad_ids: np.ndarray, values: np.ndarray, timestamp: float,
+                          keyframe: bool = True) -> bytes:
+        """Lay out the header and position columns and compress the frame"""
+        header = np.zeros(1, dtype=POSITIONS_HEADER_DTYPE)
+        header["kind"] = POSITIONS_FRAME_KIND
+        header["flags"] = POSITIONS_FLAG_KEYFRAME if keyframe else 0
+        header["count"] = len(norad_ids)
+        header["timestamp"] = timestamp * 1000
+        
+        frame = header.tobytes() + norad_ids.tobytes() + values.tobytes()
+        return bytes((POSITIONS_DEFLATE_FRAME_KIND,)) + zlib.compress(frame, self.compression_level)
 
 
 # Global connection manager instance
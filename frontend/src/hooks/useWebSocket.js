@@ -12,11 +12,69 @@ const RECONNECT_INTERVAL = 3000 // 3 seconds
 const MAX_RECONNECT_ATTEMPTS = 10
 const PING_INTERVAL = 30000 // 30 seconds
 
+// Binary frames are either UTF-8 JSON or a packed positions frame
+const textDecoder = new TextDecoder()
+
+// Positions frame layout (little-endian), mirrored from the backend:
+// header  - kind:u8, flags:u8, reserved:u8[2], count:u32, timestamp_ms:f64
+// columns - noradId:u32[count], then x, y, z, latitude, longitude, altitude, velocity:f32[count]
+// Keyframes (flags bit 0) list every satellite; other frames only those that moved, and are
+// merged into the positions already held
+// A deflate frame is one kind byte followed by a zlib-compressed positions frame
+const POSITIONS_FRAME_KIND = 1
+const POSITIONS_DEFLATE_FRAME_KIND = 2
+const POSITIONS_HEADER_SIZE = 16
+
+function decodePositionsFrame(buffer) {
+  const view = new DataView(buffer)
+  const count = view.getUint32(4, true)
+  const timestamp = new Date(view.getFloat64(8, true)).toISOString()
+  
+  // Every column starts on a 4-byte boundary, so each maps onto a typed array without copying
+  const noradIds = new Uint32Array(buffer, POSITIONS_HEADER_SIZE, count)
+  const column = (index) => new Float32Array(buffer, POSITIONS_HEADER_SIZE + (index + 1) * count * 4, count)
+  const [x, y, z, latitude, longitude, altitude, velocity] = [0, 1, 2, 3, 4, 5, 6].map(column)
+  
+  const satellites = new Array(count)
+  for (let i = 0; i < count; i++) {
+    satellites[i] = {
+      noradId: noradIds[i],
+      position: { x: x[i], y: y[i], z: z[i] },
+      latitude: latitude[i],
+      longitude: longitude[i],
+      altitude: altitude[i],
+      velocity: velocity[i],
+    }
+  }
+  
+  return { type: 'positions', timestamp, satellites }
+}
+
+function inflate(bytes) {
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'))
+  return new Response(stream).arrayBuffer()
+}
+
+async function decodeMessage(data) {
+  if (typeof data === 'string') {
+    return JSON.parse(data)
+  }
+  const kind = new Uint8Array(data, 0, 1)[0]
+  if (kind === POSITIONS_FRAME_KIND) {
+    return decodePositionsFrame(data)
+  }
+  if (kind === POSITIONS_DEFLATE_FRAME_KIND) {
+    return decodePositionsFrame(await inflate(new Uint8Array(data, 1)))
+  }
+  return JSON.parse(textDecoder.decode(data))
+}
+
 export function useWebSocket() {
   const wsRef = useRef(null)
   const reconnectAttemptsRef = useRef(0)
   const pingIntervalRef = useRef(null)
   const reconnectTimeoutRef = useRef(null)
+  const decodeQueueRef = useRef(Promise.resolve())
   
   const [isConnected, setIsConnected] = useState(false)
   const [lastUpdate, setLastUpdate] = useState(null)
@@ -35,62 +93,67 @@ export function useWebSocket() {
     }
   }, [])
 
-  // Handle incoming messages
-  const handleMessage = useCallback((event) => {
-    try {
-      const data = JSON.parse(event.data)
-      
-      switch (data.type) {
-        case 'connection':
-          console.log('🛰️ WebSocket connected:', data)
-          setIsConnected(true)
-          setError(null)
-          reconnectAttemptsRef.current = 0
-          setWebSocketStatus({
-            connected: true,
-            satelliteCount: data.satellite_count,
-            updateInterval: data.update_interval,
-          })
-          break
-          
-        case 'positions':
-          // Update satellite positions in store
-          setWebSocketPositions(data.satellites, data.timestamp)
-          setLastUpdate(new Date(data.timestamp))
-          break
-          
-        case 'pong':
-          // Keep-alive response received
-          break
-          
-        case 'ping':
-          // Server ping, respond with pong
-          sendMessage({ type: 'pong', timestamp: Date.now() })
-          break
-          
-        case 'interval_updated':
-          console.log('Update interval changed to:', data.interval)
-          break
-          
-        case 'status':
-          console.log('WebSocket status:', data)
-          setWebSocketStatus({
-            connected: true,
-            connections: data.connections,
-            satelliteCount: data.satellite_count,
-            updateInterval: data.update_interval,
-            isBroadcasting: data.is_broadcasting,
-          })
-          break
-          
-        default:
-          console.log('Unknown WebSocket message type:', data.type)
-      }
-    } catch (err) {
-      console.error('Failed to parse WebSocket message:', err)
+  // Apply a decoded message
+  const applyMessage = useCallback((data) => {
+    switch (data.type) {
+      case 'connection':
+        console.log('🛰️ WebSocket connected:', data)
+        setIsConnected(true)
+        setError(null)
+        reconnectAttemptsRef.current = 0
+        setWebSocketStatus({
+          connected: true,
+          satelliteCount: data.satellite_count,
+          updateInterval: data.update_interval,
+        })
+        break
+        
+      case 'positions':
+        // Update satellite positions in store
+        setWebSocketPositions(data.satellites, data.timestamp)
+        setLastUpdate(new Date(data.timestamp))
+        break
+        
+      case 'pong':
+        // Keep-alive response received
+        break
+        
+      case 'ping':
+        // Server ping, respond with pong
+        sendMessage({ type: 'pong', timestamp: Date.now() })
+        break
+        
+      case 'interval_updated':
+        console.log('Update interval changed to:', data.interval)
+        break
+        
+      case 'status':
+        console.log('WebSocket status:', data)
+        setWebSocketStatus({
+          connected: true,
+          connections: data.connections,
+          satelliteCount: data.satellite_count,
+          updateInterval: data.update_interval,
+          isBroadcasting: data.is_broadcasting,
+        })
+        break
+        
+      default:
+        console.log('Unknown WebSocket message type:', data.type)
     }
   }, [setWebSocketPositions, setWebSocketStatus, sendMessage])
 
+  // Handle incoming messages. Inflating a frame is asynchronous, so decoding is chained
+  // to apply messages in arrival order: a late keyframe must not overwrite newer deltas
+  const handleMessage = useCallback((event) => {
+    decodeQueueRef.current = decodeQueueRef.current
+      .then(() => decodeMessage(event.data))
+      .then(applyMessage)
+      .catch((err) => {
+        console.error('Failed to parse WebSocket message:', err)
+      })
+  }, [applyMessage])
+
   // Connect to WebSocket
   const connect = useCallback(() => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
@@ -100,6 +163,7 @@ export function useWebSocket() {
     try {
       console.log('🔌 Connecting to WebSocket:', WS_URL)
       wsRef.current = new WebSocket(WS_URL)
+      wsRef.current.binaryType = 'arraybuffer'
 
       wsRef.current.onopen = () => {
         console.log('✅ WebSocket connection established')
@@ -61,6 +61,46 @@ class ApiService {
     return this.fetch('/api/satellites/tle/all')
   }
 
+  // Get ALL TLE data as packed binary records (same shape as getAllTLE)
+  async getAllTLEBinary() {
+    const endpoint = '/api/satellites/tle/all.bin'
+    const response = await fetch(`${this.baseUrl}${endpoint}`)
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`)
+    }
+
+    const types = (response.headers.get('X-Satellite-Types') || '').split(',')
+    const buffer = await response.arrayBuffer()
+    const view = new DataView(buffer)
+    const bytes = new Uint8Array(buffer)
+    const decoder = new TextDecoder('ascii')
+    const text = (offset, length) => {
+      let end = offset + length
+      while (end > offset && bytes[end - 1] === 0) end--
+      return decoder.decode(bytes.subarray(offset, end))
+    }
+
+    // Header: count u32, last update u64 (ms); records: id i32, type u8, name[24], line1[69], line2[69]
+    const count = view.getUint32(0, true)
+    const lastUpdate = Number(view.getBigUint64(4, true))
+    const satellites = new Array(count)
+    for (let i = 0, offset = 12; i < count; i++, offset += 167) {
+      satellites[i] = {
+        id: view.getInt32(offset, true),
+        t: types[view.getUint8(offset + 4)],
+        n: text(offset + 5, 24),
+        l1: text(offset + 29, 69),
+        l2: text(offset + 98, 69),
+      }
+    }
+
+    return {
+      count,
+      last_update: lastUpdate ? new Date(lastUpdate).toISOString() : null,
+      satellites,
+    }
+  }
+
   // Get TLE data organized by category for chunked loading
   async getTLEByCategory() {
     return this.fetch('/api/satellites/tle/categories')